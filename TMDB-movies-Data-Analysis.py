@@ -24,20 +24,15 @@
 # In[106]:
 
 
-get_ipython().run_line_magic('matplotlib', 'inline')
+import sys
 
-import numpy as np
-import pandas as pd
-import matplotlib as mpl
-import matplotlib.pyplot as plt
-import seaborn as sns
+from tmdb.pipeline import main
 
 
 # In[107]:
 
 
-df = pd.read_csv ('tmdb-movies.csv')
-df.head()
+# Stage "load": tmdb-movies.csv, already limited to the columns kept below.
 
 
 # #### General Properties
@@ -47,7 +42,7 @@ df.head()
 # In[108]:
 
 
-df.drop (['id', 'imdb_id','popularity','original_title', 'cast', 'homepage', 'director', 'tagline', 'keywords', 'overview', 'runtime', 'release_date'], axis=1, inplace=True)
+# Stage "load" never parses the dropped columns (tmdb.loader.COLUMNS).
 
 
 # <a id='wrangling'></a>
@@ -58,7 +53,7 @@ df.drop (['id', 'imdb_id','popularity','original_title', 'cast', 'homepage', 'di
 # In[109]:
 
 
-df.describe()
+# Stage "describe" -> output/describe.csv
 
 
 # #### Numerical Data
@@ -69,7 +64,7 @@ df.describe()
 # In[110]:
 
 
-df.info()
+# The dtypes are fixed by tmdb.loader.SCHEMA.
 
 
 # #### Data Cleaning
@@ -81,13 +76,13 @@ df.info()
 # In[111]:
 
 
-df[df.genres.isnull()].hist(figsize=(10,8));
+# Stage "missing_genres" -> output/missing_genres.png
 
 
 # In[112]:
 
 
-df[df.production_companies.isnull()].hist(figsize=(10,8));
+# Stage "missing_companies" -> output/missing_companies.png
 
 
 # #### Categorical Data
@@ -99,14 +94,13 @@ df[df.production_companies.isnull()].hist(figsize=(10,8));
 # In[113]:
 
 
-df.drop (['budget_adj', 'revenue_adj'], axis=1, inplace=True)
+# Stage "clean" (tmdb.loader.clean_movies).
 
 
 # In[114]:
 
 
-df.dropna(inplace=True)
-df.info()
+# Stage "clean" (tmdb.loader.clean_movies).
 
 
 # <a id='eda'></a>
@@ -121,13 +115,13 @@ df.info()
 # In[115]:
 
 
-df.hist(figsize=(10,8));
+# Stage "histograms" -> output/histograms.png
 
 
 # In[116]:
 
 
-df.sort_values(by=['revenue', 'vote_average', 'release_year'], ascending=False, na_position='first')
+# Stage "rankings" -> output/rankings.csv
 
 
 # ### What are the best financial performances associated with the best ratings?
@@ -147,16 +141,13 @@ df.sort_values(by=['revenue', 'vote_average', 'release_year'], ascending=False,
 # In[121]:
 
 
-plt.scatter(df['budget'], df['revenue'])
-plt.xlabel('Budget')
-plt.ylabel('Revenue')
+# Stage "budget_revenue" -> output/budget_revenue.png
 
 
 # In[170]:
 
 
-sns.set_style("whitegrid")
-ax = sns.pointplot(x='vote_count', y='vote_average', data=df)
+# Stage "votes" -> output/votes.png
 
 
 # ### Which production companies are associated with the financial performances and best ratings?
@@ -172,33 +163,21 @@ ax = sns.pointplot(x='vote_count', y='vote_average', data=df)
 # In[144]:
 
 
-production_companies = df["production_companies"].str.cat(sep="|").split("|")
-
-table=pd.Series(production_companies).value_counts(ascending=True)[-10:]
-graph = table.plot.barh()
-graph.set(title = "Most active Producers",xlabel = "Top Producers")
-print(table)
+# Stages "company_counts" and "top_producers"
+# -> output/company_counts.csv, output/top_producers.png
 
 
 # In[157]:
 
 
-get_ipython().run_line_magic('matplotlib', 'inline')
-plt.xlabel('Financial Performance')
-plt.ylabel('Ratings')
-plt.scatter(df['budget'], df['vote_average'])
-plt.show()
+# Stage "budget_rating" -> output/budget_rating.png
 
 
 # In[142]:
 
 
-genres = df["genres"].str.cat(sep="|").split("|")
-
-table=pd.Series(genres).value_counts(ascending=True)[-10:]
-graph = table.plot.barh()
-graph.set(title = "Most Produced Genres",xlabel = "genres")
-print(table)
+# Stages "genre_counts" and "top_genres"
+# -> output/genre_counts.csv, output/top_genres.png
 
 
 # ### Which film genres seem to have performed better over the last years financially and in ratings?
@@ -214,7 +193,8 @@ print(table)
 # In[138]:
 
 
-sns.heatmap(df[['release_year','budget','revenue', 'vote_average']].corr(),annot=True);
+# Stages "correlations" and "corr_heatmap"
+# -> output/correlations.csv, output/corr_heatmap.png
 
 
 # <a id='conclusions'></a>
@@ -245,6 +225,5 @@ sns.heatmap(df[['release_year','budget','revenue', 'vote_average']].corr(),annot
 # In[ ]:
 
 
-from subprocess import call
-call(['python', '-m', 'nbconvert', 'Investigate_a_Dataset.ipynb'])
-
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+GENRES = ["Drama", "Comedy", "Action", "Horror", "Family"]
+COMPANIES = ["Universal", "Warner", "Paramount", "Fox", "Disney", "MGM"]
+
+
+def _pipe_lists(rng, vocabulary, n, longest):
+    lengths = rng.integers(1, longest + 1, n)
+    return [
+        "|".join(rng.choice(vocabulary, size=length, replace=False))
+        for length in lengths
+    ]
+
+
+@pytest.fixture
+def make_movies():
+    """Random cleaned movies frames with many ties.
+
+    ``make_movies(seed, n)`` gives a frame with the columns and dtypes of
+    ``tmdb.load_movies``; values come from small ranges so sort keys,
+    quantiles and token counts tie often.
+    """
+
+    def make(seed, n=200):
+        rng = np.random.default_rng(seed)
+        frame = pd.DataFrame(
+            {
+                "budget": rng.integers(0, 6, n).astype(np.int32) * 10**6,
+                "revenue": rng.integers(0, 8, n).astype(np.int64) * 10**7,
+                "genres": _pipe_lists(rng, GENRES, n, 3),
+                "production_companies": _pipe_lists(rng, COMPANIES, n, 3),
+                "vote_count": rng.integers(10, 30, n).astype(np.int32),
+                "vote_average": rng.integers(20, 90, n).astype(np.float32)
+                / 10,
+                "release_year": rng.integers(2000, 2006, n).astype(np.int16),
+            }
+        )
+        for column in ("genres", "production_companies"):
+            frame[column] = frame[column].astype("category")
+        # Row labels with gaps, as left by dropna.
+        frame.index = np.sort(rng.choice(3 * n, size=n, replace=False))
+        return frame
+
+    return make
@@ -0,0 +1,119 @@
+import json
+
+import pandas as pd
+import pytest
+
+from tmdb import bench
+
+
+@pytest.mark.parametrize(
+    "text, rows",
+    [
+        ("2500", 2500),
+        ("10k", 10_000),
+        ("1M", 10**6),
+        ("1.5m", 1_500_000),
+        ("10_000", 10_000),
+        ("2g", 2 * 10**9),
+    ],
+)
+def test_parse_rows(text, rows):
+    assert bench.parse_rows(text) == rows
+
+
+@pytest.mark.parametrize("rows", [0, 999, 2500, 10_000, 1_500_000, 10**9])
+def test_rows_label_round_trips(rows):
+    assert bench.parse_rows(bench.rows_label(rows)) == rows
+
+
+def test_rows_labels():
+    assert [bench.rows_label(n) for n in (10**4, 10**6, 1_500_000)] == [
+        "10k",
+        "1m",
+        "1500k",
+    ]
+
+
+def _report(*stages, rows=1000):
+    return {
+        "version": bench.REPORT_VERSION,
+        "runs": [
+            {
+                "rows": rows,
+                "stages": [
+                    {
+                        "name": name,
+                        "status": status,
+                        "seconds": seconds,
+                        "peak_increase_bytes": memory,
+                    }
+                    for name, status, seconds, memory in stages
+                ],
+            }
+        ],
+    }
+
+
+BASELINE = _report(
+    ("read", "ok", 1.0, 10 * 2**20),
+    ("tiny", "ok", 0.01, 0),
+    ("plot", "ok", 0.5, 0),
+    ("gone", "ok", 0.5, 0),
+    ("skipped", "skipped", 0.0, 0),
+)
+
+
+def test_compare_flags_slower_and_larger_stages():
+    current = _report(
+        ("read", "ok", 1.5, 10 * 2**20),
+        # Three times slower, but both runs are under min_seconds.
+        ("tiny", "ok", 0.03, 0),
+        # Within the tolerance in time, 8 MiB more memory.
+        ("plot", "ok", 0.55, 8 * 2**20),
+        ("new", "ok", 2.0, 0),
+        ("skipped", "ok", 9.0, 0),
+    )
+    comparison = bench.compare(BASELINE, current)
+    assert list(comparison.index) == [
+        (1000, "read"),
+        (1000, "tiny"),
+        (1000, "plot"),
+    ]
+    assert comparison["regression"].tolist() == [True, False, True]
+    assert comparison.loc[(1000, "read"), "time_ratio"] == pytest.approx(1.5)
+    assert not bench.compare(BASELINE, current, tolerance=1.0)[
+        "regression"
+    ].loc[(1000, "read")]
+    assert bench.compare(BASELINE, current, min_seconds=0.001)[
+        "regression"
+    ].loc[(1000, "tiny")]
+
+
+def test_compare_of_a_report_with_itself_is_clean():
+    comparison = bench.compare(BASELINE, BASELINE)
+    assert not comparison["regression"].any()
+    assert (comparison["time_ratio"] == 1).all()
+
+
+def test_compare_command_exit_status(tmp_path, capsys):
+    paths = {}
+    for name, report in [
+        ("baseline", BASELINE),
+        ("same", BASELINE),
+        ("slower", _report(("read", "ok", 3.0, 10 * 2**20))),
+        ("old", {**BASELINE, "version": 0}),
+    ]:
+        paths[name] = str(tmp_path / (name + ".json"))
+        with open(paths[name], "w") as out:
+            json.dump(report, out)
+    assert bench.main(["compare", paths["baseline"], paths["same"]]) == 0
+    assert bench.main(["compare", paths["baseline"], paths["slower"]]) == 1
+    assert "1 regression(s)" in capsys.readouterr().out
+    with pytest.raises(ValueError):
+        bench.main(["compare", paths["baseline"], paths["old"]])
+
+
+def test_generate_command(tmp_path):
+    out = str(tmp_path / "movies.csv")
+    assert bench.main(["generate", "--rows", "200", "--out", out]) == 0
+    assert len(pd.read_csv(out)) == 200
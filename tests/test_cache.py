@@ -0,0 +1,101 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from tmdb import cache, load_cached_movies, load_movies
+from tmdb.loader import read_movies
+from tmdb.synthetic import generate_csv
+
+
+def _entries(cache_dir):
+    return sorted(
+        name for name in os.listdir(cache_dir) if name != "sources"
+    )
+
+
+def _assert_same(result, expected):
+    # assert_frame_equal tells memory-mapped columns from ndarrays apart;
+    # equals compares values, dtypes and labels only.
+    assert result.equals(expected)
+    assert list(result.dtypes) == list(expected.dtypes)
+
+
+def _refuse(*args, **kwargs):
+    raise AssertionError("the CSV was parsed")
+
+
+@pytest.fixture
+def movies_csv(tmp_path):
+    return generate_csv(tmp_path / "movies.csv", rows=400, seed=7)
+
+
+def test_cold_and_warm_loads_match_load_movies(
+    tmp_path, movies_csv, monkeypatch
+):
+    cache_dir = tmp_path / "cache"
+    expected = load_movies(movies_csv)
+    _assert_same(load_cached_movies(movies_csv, cache_dir), expected)
+    # A warm hit memory-maps the columns and parses nothing.
+    monkeypatch.setattr(cache, "load_movies", _refuse)
+    monkeypatch.setattr(pd, "read_csv", _refuse)
+    warm = load_cached_movies(movies_csv, cache_dir)
+    _assert_same(warm, expected)
+    assert not warm["budget"].to_numpy().flags.writeable
+
+
+def test_manifest_holds_only_metadata(tmp_path, movies_csv):
+    cache_dir = tmp_path / "cache"
+    frame = load_cached_movies(movies_csv, cache_dir)
+    (entry,) = _entries(cache_dir)
+    with open(cache_dir / entry / "manifest.json") as source:
+        manifest = json.load(source)
+    assert manifest["columns"]["genres"] == {"kind": "category"}
+    assert len(frame["production_companies"].cat.categories) > 100
+    assert os.path.getsize(cache_dir / entry / "manifest.json") < 1000
+
+
+def test_stale_entry_is_rebuilt_and_removed(tmp_path, movies_csv):
+    cache_dir = tmp_path / "cache"
+    load_cached_movies(movies_csv, cache_dir)
+    (old,) = _entries(cache_dir)
+    generate_csv(movies_csv, rows=300, seed=8)
+    frame = load_cached_movies(movies_csv, cache_dir)
+    _assert_same(frame, load_movies(movies_csv))
+    (new,) = _entries(cache_dir)
+    assert new != old
+
+
+def test_strings_round_trip(tmp_path):
+    categories = ["", "Drama", "Ciné|Société", "a\0b", "日本", "z" * 300]
+    frame = pd.DataFrame(
+        {
+            "text": pd.Categorical(
+                ["Drama", None, "a\0b", "日本", ""], categories=categories
+            ),
+            "none": pd.Categorical([None] * 5, categories=[]),
+            "votes": pd.array([1, None, 3, 4, 5], dtype="Int64"),
+            "score": np.linspace(0, 1, 5, dtype=np.float32),
+        },
+        index=[3, 8, 9, 20, 21],
+    )
+    cache.write_frame(frame, str(tmp_path / "entry"))
+    _assert_same(cache.read_frame(str(tmp_path / "entry")), frame)
+
+
+def test_raw_frame_round_trips(tmp_path, movies_csv):
+    raw = read_movies(movies_csv)
+    assert raw.isna().any().any()
+    cache.write_frame(raw, str(tmp_path / "entry"))
+    _assert_same(cache.read_frame(str(tmp_path / "entry")), raw)
+
+
+def test_other_layout_versions_are_not_read(tmp_path, monkeypatch):
+    entry = str(tmp_path / "entry")
+    monkeypatch.setattr(cache, "CACHE_VERSION", 1)
+    cache.write_frame(pd.DataFrame({"a": [1, 2]}), entry)
+    monkeypatch.undo()
+    with pytest.raises(FileNotFoundError):
+        cache.read_frame(entry)
@@ -0,0 +1,141 @@
+import numpy as np
+import pytest
+
+from tmdb import MovieCube, TokenIndex
+from tmdb.cube import MEASURES
+
+
+def _exploded(frame):
+    """One row per (movie, genre, company) of ``frame``."""
+    rows = frame.reset_index(drop=True).assign(
+        genre=lambda f: f["genres"].astype(object).str.split("|"),
+        company=lambda f: f["production_companies"]
+        .astype(object)
+        .str.split("|"),
+        movie=lambda f: np.arange(len(f)),
+    )
+    return rows.explode("genre").explode("company")
+
+
+def _expected(exploded, by):
+    # A movie counts once per cell even when the exploded rows repeat it.
+    cells = exploded.drop_duplicates(["movie"] + by)
+    values = cells[MEASURES].astype(np.float64)
+    if by:
+        values = values.groupby([cells[d] for d in by])
+    return values.agg(["count", "sum", "mean", "std", "min", "max"])
+
+
+def _check(result, expected):
+    for measure in MEASURES:
+        np.testing.assert_allclose(
+            result["count"], expected[(measure, "count")]
+        )
+        for stat in ("sum", "mean", "std", "min", "max"):
+            np.testing.assert_allclose(
+                result[measure + "_" + stat],
+                expected[(measure, stat)],
+                rtol=1e-9,
+                equal_nan=True,
+                err_msg="%s_%s" % (measure, stat),
+            )
+
+
+def _cube(frame, chunk_rows=64):
+    return MovieCube.build(
+        frame,
+        TokenIndex.from_series(frame["genres"]),
+        TokenIndex.from_series(frame["production_companies"]),
+        chunk_rows=chunk_rows,
+    )
+
+
+@pytest.mark.parametrize(
+    "by",
+    [
+        [],
+        ["release_year"],
+        ["genre"],
+        ["company"],
+        ["release_year", "genre"],
+        ["genre", "company"],
+        ["release_year", "genre", "company"],
+    ],
+)
+def test_cuboids_match_groupby(make_movies, by):
+    frame = make_movies(0)
+    cube = _cube(frame)
+    expected = _expected(_exploded(frame), by)
+    result = cube.query(by)
+    if by:
+        result = result.sort_index()
+        expected = expected.sort_index()
+        assert list(result.index) == list(expected.index)
+    else:
+        expected = expected.T.stack().to_frame().T
+    _check(result, expected)
+
+
+def test_sliced_roll_up_matches_groupby(make_movies):
+    frame = make_movies(1)
+    cube = _cube(frame)
+    exploded = _exploded(frame)
+    selected = exploded[
+        (exploded["genre"] == "Action")
+        & exploded["release_year"].between(2001, 2004)
+    ]
+    result = cube.query(
+        ["release_year", "company"], genre="Action", years=(2001, 2004)
+    ).sort_index()
+    expected = _expected(selected, ["release_year", "company"]).sort_index()
+    assert list(result.index) == list(expected.index)
+    _check(result, expected)
+
+
+def test_decades_roll_up_years(make_movies):
+    frame = make_movies(2)
+    frame["release_year"] = np.linspace(1960, 2015, len(frame)).astype(
+        np.int16
+    )
+    exploded = _exploded(frame).assign(
+        decade=lambda f: f["release_year"] // 10 * 10
+    )
+    selected = exploded[exploded["company"] == "Fox"]
+    result = _cube(frame).query("decade", company="Fox")
+    expected = _expected(selected, ["decade"])
+    assert list(result.index) == list(expected.index)
+    _check(result, expected)
+
+
+def test_chunking_does_not_change_the_cells(make_movies):
+    frame = make_movies(3, n=30)
+    whole, rows = _cube(frame, chunk_rows=1000), _cube(frame, chunk_rows=7)
+    for dims, cells in whole.cuboids.items():
+        np.testing.assert_allclose(rows.cuboids[dims], cells, rtol=1e-12)
+
+
+def test_repeated_token_counts_the_movie_once(make_movies):
+    frame = make_movies(4, n=2)
+    frame["genres"] = ["Drama|Drama", "Drama"]
+    frame["genres"] = frame["genres"].astype("category")
+    cells = _cube(frame).query("genre")
+    assert list(cells.index) == ["Drama"]
+    assert cells.loc["Drama", "count"] == 2
+    assert cells.loc["Drama", "budget_sum"] == frame["budget"].sum()
+
+
+def test_single_movie_has_no_spread(make_movies):
+    frame = make_movies(5, n=1)
+    cells = _cube(frame).query(["genre", "company"])
+    assert (cells["count"] == 1).all()
+    assert cells["revenue_std"].isna().all()
+    assert (cells["revenue_mean"] == frame["revenue"].iloc[0]).all()
+
+
+def test_empty_slice_and_bad_queries(make_movies):
+    cube = _cube(make_movies(6))
+    assert cube.query("genre", years=(1900, 1910)).empty
+    with pytest.raises(ValueError):
+        cube.query("country")
+    with pytest.raises(KeyError):
+        cube.query("release_year", genre="Western")
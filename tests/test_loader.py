@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from tmdb import load_movies
+from tmdb.bench import DROPPED, DROPPED_ADJ
+from tmdb.loader import COLUMNS, RAW_COLUMNS, SCHEMA, read_movies
+from tmdb.synthetic import generate_csv
+
+
+def _script(path):
+    """Cells [107]-[114]."""
+    df = pd.read_csv(path)
+    df.drop(DROPPED, axis=1, inplace=True)
+    raw = df.copy()
+    df.drop(DROPPED_ADJ, axis=1, inplace=True)
+    df.dropna(inplace=True)
+    return raw, df
+
+
+@pytest.fixture
+def movies_csv(tmp_path):
+    return generate_csv(tmp_path / "movies.csv", rows=600, seed=2)
+
+
+@pytest.mark.parametrize("chunksize", [None, 37])
+def test_load_movies_matches_the_script(movies_csv, chunksize):
+    raw, expected = _script(movies_csv)
+    result = load_movies(movies_csv, chunksize=chunksize)
+    assert list(result.columns) == COLUMNS
+    assert result.dtypes.astype(str).to_dict() == SCHEMA
+    assert len(result) < len(raw)
+    pd.testing.assert_frame_equal(
+        result.astype({"genres": object, "production_companies": object}),
+        expected,
+        check_dtype=False,
+        check_index_type=False,
+    )
+
+
+def test_read_movies_keeps_incomplete_rows(movies_csv):
+    raw, _ = _script(movies_csv)
+    result = read_movies(movies_csv, chunksize=37)
+    assert list(result.columns) == RAW_COLUMNS
+    pd.testing.assert_frame_equal(
+        result.astype({"genres": object, "production_companies": object}),
+        raw[RAW_COLUMNS],
+        check_dtype=False,
+        check_index_type=False,
+    )
+
+
+def test_out_of_range_budget_raises(tmp_path):
+    path = generate_csv(
+        tmp_path / "movies.csv", rows=600, seed=2, oversized_budgets=0.05
+    )
+    raw, expected = _script(path)
+    assert (expected["budget"] > np.iinfo(np.int32).max).any()
+    with pytest.raises(ValueError, match="budget does not fit in int32"):
+        load_movies(path, chunksize=37)
+    # The uncleaned frame keeps nullable int64 and the exact values.
+    pd.testing.assert_series_equal(
+        read_movies(path)["budget"], raw["budget"], check_dtype=False
+    )
+
+
+def test_missing_integers_are_dropped(tmp_path):
+    path = tmp_path / "movies.csv"
+    frame = pd.read_csv(generate_csv(path, rows=50, seed=3))
+    frame.loc[[4, 9], "vote_count"] = np.nan
+    frame.loc[7, "release_year"] = np.nan
+    frame.to_csv(path, index=False)
+    result = load_movies(path)
+    assert not result.index.isin([4, 7, 9]).any()
+    assert result["vote_count"].dtype == np.int32
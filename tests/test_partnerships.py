@@ -0,0 +1,155 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from tmdb import PartnershipIndex, TokenIndex
+from tmdb.partnerships import (
+    METRICS,
+    top_partnerships_by_genre,
+    top_partnerships_by_year,
+)
+
+
+def _pairs(frame):
+    """Partnership statistics from every pair of companies of each movie."""
+    records = []
+    for companies, *values in zip(
+        frame["production_companies"].astype(object), *map(frame.get, METRICS)
+    ):
+        names = sorted(set(companies.split("|")))
+        for a, b in itertools.combinations(names, 2):
+            records.append((a, b, *values))
+    table = pd.DataFrame(records, columns=["company_a", "company_b"] + METRICS)
+    grouped = table.groupby(["company_a", "company_b"])
+    expected = grouped.size().rename("count").to_frame()
+    for metric in METRICS:
+        expected[metric + "_sum"] = grouped[metric].sum()
+    return expected.sort_index()
+
+
+def _check(table, frame):
+    """``table`` (from ``to_frame`` or ``top``) against ``_pairs(frame)``."""
+    names = np.sort(table[["company_a", "company_b"]].to_numpy(), axis=1)
+    table = table.assign(company_a=names[:, 0], company_b=names[:, 1])
+    result = table.set_index(["company_a", "company_b"]).sort_index()
+    expected = _pairs(frame)
+    assert list(result.index) == list(expected.index)
+    np.testing.assert_array_equal(result["count"], expected["count"])
+    for metric in METRICS:
+        np.testing.assert_allclose(
+            result[metric + "_sum"], expected[metric + "_sum"], rtol=1e-6
+        )
+        np.testing.assert_allclose(
+            result[metric + "_mean"],
+            expected[metric + "_sum"] / expected["count"],
+            rtol=1e-6,
+        )
+
+
+def _index(frame):
+    companies = TokenIndex.from_series(frame["production_companies"])
+    return companies, PartnershipIndex.build(companies, frame)
+
+
+def _movies(make_movies, companies, **columns):
+    frame = make_movies(0, n=len(companies))
+    frame["production_companies"] = pd.Series(
+        companies, index=frame.index, dtype="category"
+    )
+    for column, values in columns.items():
+        frame[column] = values
+    return frame
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_pair_sums_match_brute_force(make_movies, seed):
+    frame = make_movies(seed)
+    _, index = _index(frame)
+    _check(index.to_frame(), frame)
+    a, b = _pairs(frame).index[0]
+    assert index.pair(b, a)["count"] == _pairs(frame)["count"].iloc[0]
+
+
+def test_rows_restrict_the_movies(make_movies):
+    frame = make_movies(3)
+    companies = TokenIndex.from_series(frame["production_companies"])
+    rows = np.flatnonzero(frame["release_year"].to_numpy() % 2 == 0)
+    index = PartnershipIndex.build(companies, frame, rows=rows)
+    _check(index.to_frame(), frame.iloc[rows])
+
+
+def test_zero_sums_and_repeated_companies(make_movies):
+    frame = _movies(
+        make_movies,
+        ["Fox|Fox|MGM", "MGM|Fox", "Fox"],
+        revenue=np.zeros(3, dtype=np.int64),
+    )
+    _, index = _index(frame)
+    # The pair's revenue sums to zero but it is still a pair; Fox is only
+    # counted once in the first movie.
+    _check(index.to_frame(), frame)
+    assert index.pair("Fox", "MGM")["count"] == 2
+    with pytest.raises(KeyError):
+        index.pair("Fox", "Fox")
+
+
+def test_movies_without_partners(make_movies):
+    frame = _movies(make_movies, ["Fox", "MGM", "Fox"])
+    companies, index = _index(frame)
+    assert len(index) == 0
+    assert index.top(3).empty
+    assert list(index.top(3).columns) == list(index.top(0).columns)
+    assert index.partners("Fox").empty
+    with pytest.raises(KeyError):
+        index.pair("Fox", "MGM")
+    table = top_partnerships_by_genre(
+        companies, TokenIndex.from_series(frame["genres"]), frame
+    )
+    assert table.empty and table.columns[0] == "genre"
+
+
+def test_zero_k(make_movies):
+    frame = make_movies(4)
+    companies, index = _index(frame)
+    assert index.top(0).empty
+    assert list(index.top(0).columns) == list(index.top(3).columns)
+    assert index.partners(companies.vocabulary[0], k=0).empty
+
+
+def test_groups_match_brute_force_and_are_cached(make_movies):
+    frame = make_movies(5)
+    companies, index = _index(frame)
+    genres = TokenIndex.from_series(frame["genres"])
+    by_genre = index.by_group("genre", genres)
+    assert list(by_genre) == list(genres.vocabulary)
+    for genre, group in by_genre.items():
+        _check(group.to_frame(), frame[genres.rows_with(genre)])
+    assert index.by_group("genre") is by_genre
+    with pytest.raises(KeyError):
+        index.by_group("release_year")
+
+    years = frame["release_year"].to_numpy()
+    table = index.top_by_group("release_year", k=3, groups=years)
+    for year, group in table.groupby("release_year"):
+        expected = _pairs(frame[years == year])
+        assert list(group["count"]) == sorted(expected["count"])[::-1][:3]
+    pd.testing.assert_frame_equal(
+        table, top_partnerships_by_year(companies, frame, k=3)
+    )
+    pd.testing.assert_frame_equal(
+        index.top_by_group("genre", k=2, by="revenue_sum"),
+        top_partnerships_by_genre(companies, genres, frame, 2, "revenue_sum"),
+    )
+
+
+def test_empty_frame(make_movies):
+    frame = make_movies(6, n=0)
+    companies, index = _index(frame)
+    assert len(index) == 0
+    empty = top_partnerships_by_year(companies, frame)
+    frame = make_movies(6)
+    full = top_partnerships_by_year(_index(frame)[0], frame)
+    assert empty.empty
+    assert list(empty.columns) == list(full.columns)
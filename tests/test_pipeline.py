@@ -0,0 +1,173 @@
+import filecmp
+import os
+import shutil
+
+import pandas as pd
+import pytest
+
+from tmdb import load_movies, pipeline
+from tmdb.pipeline import STAGES
+from tmdb.synthetic import generate_csv
+
+TABLES = [name for name, stage in STAGES.items() if stage.output == "csv"]
+
+
+# The path of the CSV is a parameter of the load stage, so every test runs
+# with the same relative paths from its own directory to share keys.
+CSV, CACHE = "movies.csv", "cache"
+
+
+@pytest.fixture(scope="module")
+def first_run(tmp_path_factory):
+    """A cold run of every stage, inline, on a small synthetic file."""
+    root = tmp_path_factory.mktemp("pipeline")
+    generate_csv(root / CSV, rows=300, seed=1)
+    cwd = os.getcwd()
+    os.chdir(root)
+    try:
+        keys, timings = pipeline.run(csv=CSV, cache_dir=CACHE, workers=1)
+    finally:
+        os.chdir(cwd)
+    return root, keys, timings
+
+
+@pytest.fixture
+def warm(first_run, tmp_path, monkeypatch):
+    """A copy of the first run's file and cache that tests may modify."""
+    root, keys, _ = first_run
+    shutil.copy(root / CSV, tmp_path / CSV)
+    shutil.copytree(root / CACHE, tmp_path / CACHE)
+    monkeypatch.chdir(tmp_path)
+    return CSV, CACHE, keys
+
+
+def test_cold_run_runs_every_stage(first_run):
+    _, keys, timings = first_run
+    assert set(keys) == set(timings) == set(STAGES)
+
+
+def test_warm_run_is_all_cached(warm):
+    csv, cache_dir, keys = warm
+    lines = []
+    new_keys, timings = pipeline.run(
+        csv=csv, cache_dir=cache_dir, workers=1, log=lines.append
+    )
+    assert new_keys == keys
+    assert timings == {}
+    assert sorted(line.split() for line in lines) == sorted(
+        [name, "cached"] for name in STAGES
+    )
+
+
+def test_edited_csv_reruns_load_and_everything_downstream(warm):
+    csv, cache_dir, keys = warm
+    generate_csv(csv, rows=300, seed=2)
+    new_keys, timings = pipeline.run(csv=csv, cache_dir=cache_dir, workers=1)
+    # Every stage depends on load.
+    assert set(timings) == set(STAGES)
+    assert all(new_keys[name] != keys[name] for name in STAGES)
+    clean = pipeline.load_result("clean", new_keys["clean"], cache_dir)
+    assert clean.equals(load_movies(csv))
+
+
+def test_a_parameter_reruns_only_its_stages(warm):
+    csv, cache_dir, keys = warm
+    new_keys, timings = pipeline.run(
+        csv=csv, cache_dir=cache_dir, workers=1, top=3
+    )
+    assert set(timings) == {"rankings"}
+    assert {name for name in STAGES if new_keys[name] != keys[name]} == {
+        "rankings"
+    }
+    table = pipeline.load_result("rankings", new_keys["rankings"], cache_dir)
+    assert len(table) == 6
+
+
+def test_force_replaces_the_columnar_entries(warm):
+    csv, cache_dir, keys = warm
+    entries = {
+        name: pipeline._entry(cache_dir, name, keys[name])
+        for name in ("load", "clean")
+    }
+    for entry in entries.values():
+        open(os.path.join(entry, "stale"), "w").close()
+    _, timings = pipeline.run(
+        ["clean"], csv=csv, cache_dir=cache_dir, workers=1, force=True
+    )
+    assert set(timings) == {"load", "clean"}
+    for name, entry in entries.items():
+        assert not os.path.exists(os.path.join(entry, "stale"))
+        assert os.listdir(os.path.dirname(entry)) == [keys[name]]
+    clean = pipeline.load_result("clean", keys["clean"], cache_dir)
+    assert clean.equals(load_movies(csv))
+
+
+def test_process_pool_exports_the_same_tables(
+    first_run, tmp_path, monkeypatch
+):
+    root, keys, _ = first_run
+    inline = tmp_path / "inline"
+    pipeline.export(TABLES, keys, str(inline), str(root / CACHE))
+    shutil.copy(root / CSV, tmp_path / CSV)
+    monkeypatch.chdir(tmp_path)
+    pooled = tmp_path / "pooled"
+    argv = [*TABLES, "--csv", CSV, "--cache-dir", CACHE, "--workers", "2"]
+    assert pipeline.main(argv + ["--output", str(pooled)]) == 0
+    names = [name + ".csv" for name in TABLES]
+    match, mismatch, errors = filecmp.cmpfiles(
+        inline, pooled, names, shallow=False
+    )
+    assert (mismatch, errors) == ([], [])
+    assert len(match) == len(TABLES) > 0
+
+
+def test_code_payload_follows_the_tmdb_code():
+    def changed(module):
+        edited = {module: "edited"}
+        return {
+            name
+            for name, current in STAGES.items()
+            if pipeline._code_payload(current.func, {})
+            != pipeline._code_payload(current.func, dict(edited))
+        }
+
+    assert changed("tmdb.ranking") == {"rankings"}
+    assert changed("tmdb.plots") == {
+        "votes",
+        "budget_revenue",
+        "budget_rating",
+    }
+    # correlations only takes CORR_COLUMNS from tmdb.stats, a constant.
+    assert changed("tmdb.loader") == {"load", "clean"}
+    assert changed("tmdb.tokens") == {"genre_tokens", "company_tokens"}
+
+
+def test_constants_are_part_of_the_keys(warm, monkeypatch):
+    csv, cache_dir, keys = warm
+    params = {"csv": csv, "memory_budget": 2**20, "top": 10}
+    before = pipeline.stage_keys(list(STAGES), params, cache_dir)
+    monkeypatch.setattr(pipeline, "RANKING", ["budget", "revenue"])
+    after = pipeline.stage_keys(list(STAGES), params, cache_dir)
+    assert {name for name in STAGES if before[name] != after[name]} == {
+        "rankings"
+    }
+
+
+# sns.heatmap of the all-NaN correlations of no movies.
+@pytest.mark.filterwarnings("ignore:All-NaN slice:RuntimeWarning")
+def test_file_without_complete_rows(tmp_path):
+    csv = tmp_path / "movies.csv"
+    frame = pd.read_csv(generate_csv(csv, rows=50, seed=3))
+    frame["genres"] = None
+    frame.to_csv(csv, index=False)
+    keys, timings = pipeline.run(
+        csv=str(csv), cache_dir=str(tmp_path / "cache"), workers=1
+    )
+    assert set(timings) == set(STAGES)
+    clean = pipeline.load_result("clean", keys["clean"], tmp_path / "cache")
+    assert clean.empty
+
+
+def test_unknown_stage():
+    with pytest.raises(ValueError):
+        pipeline.run(["nope"])
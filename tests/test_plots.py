@@ -0,0 +1,87 @@
+import matplotlib
+
+matplotlib.use("Agg")
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+import pytest  # noqa: E402
+from matplotlib.figure import Figure  # noqa: E402
+
+from tmdb import plots  # noqa: E402
+
+
+def _reference(data, x, y, bins):
+    """The same table with qcut and groupby."""
+    cuts = pd.qcut(data[x], bins, duplicates="drop")
+    grouped = data.groupby(cuts, observed=True)
+    return pd.DataFrame(
+        {
+            x: grouped[x].mean(),
+            "count": grouped[y].count(),
+            "mean": grouped[y].mean(),
+            "std": grouped[y].std(),
+        }
+    ).reset_index(drop=True)
+
+
+def _votes(seed, n=500):
+    rng = np.random.default_rng(seed)
+    # Most movies sit at the minimum of 10 votes, which collapses the lower
+    # quantiles into a single edge.
+    votes = np.where(
+        rng.random(n) < 0.6, 10, 10 + rng.lognormal(3, 1.5, n).astype(int)
+    )
+    return pd.DataFrame(
+        {"vote_count": votes, "vote_average": rng.normal(6, 1, n).round(1)}
+    )
+
+
+@pytest.mark.parametrize("bins", [1, 4, 20])
+@pytest.mark.parametrize("seed", range(3))
+def test_binned_means_match_qcut(seed, bins):
+    data = _votes(seed)
+    result = plots.binned_means(data, "vote_count", "vote_average", bins)
+    expected = _reference(data, "vote_count", "vote_average", bins)
+    if bins == 20:
+        assert len(result) < bins
+    pd.testing.assert_frame_equal(
+        result[expected.columns], expected, check_dtype=False
+    )
+    assert result["left"].iloc[0] == data["vote_count"].min()
+    assert result["right"].iloc[-1] == data["vote_count"].max()
+    assert (result["low"] <= result["mean"]).all()
+
+
+def test_values_on_an_edge_go_to_the_lower_bin():
+    data = pd.DataFrame({"x": [1, 2, 3, 4, 5], "y": [1.0, 2, 3, 4, 5]})
+    result = plots.binned_means(data, "x", "y", bins=2)
+    # Edges 1, 3, 5: qcut's (1, 3] holds 1, 2 and 3.
+    assert result["count"].tolist() == [3, 2]
+    assert result["mean"].tolist() == [2.0, 4.5]
+
+
+def test_single_distinct_value_and_single_row():
+    data = pd.DataFrame({"x": [7, 7, 7], "y": [1.0, 2.0, 3.0]})
+    result = plots.binned_means(data, "x", "y")
+    columns = ["left", "right", "count", "mean", "std"]
+    assert result[columns].values.tolist() == [[7, 7, 3, 2.0, 1.0]]
+    single = plots.binned_means(data.iloc[:1], "x", "y")
+    assert single["count"].tolist() == [1]
+    assert single["std"].isna().all()
+
+
+def test_empty_input_gives_an_empty_table():
+    data = pd.DataFrame({"x": [], "y": []}, dtype=np.float64)
+    result = plots.binned_means(data, "x", "y")
+    assert result.empty
+    assert list(result.columns) == [
+        "left", "right", "x", "count", "mean", "std", "low", "high"
+    ]
+    plots.binned_pointplot(data, "x", "y", logx=True, ax=Figure().subplots())
+
+
+@pytest.mark.parametrize("kind", ["hexbin", "hist2d"])
+def test_density_plot_of_no_movies(kind):
+    data = pd.DataFrame({"x": [], "y": []}, dtype=np.float64)
+    ax = plots.density_plot(data, "x", "y", kind=kind, ax=Figure().subplots())
+    assert ax.get_xlabel() == "x"
@@ -0,0 +1,145 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from tmdb import TokenIndex, bottom_k, top_k, top_k_by, top_k_by_token
+from tmdb import ranking
+
+BY = ["score", "revenue", "label"]
+
+
+def _with_nans(frame, seed):
+    rng = np.random.default_rng(seed)
+    frame = frame.copy()
+    score = rng.integers(0, 5, len(frame)).astype(np.float64)
+    score[rng.random(len(frame)) < 0.2] = np.nan
+    frame["score"] = score
+    frame["label"] = rng.choice(["x", "y", "z"], len(frame))
+    return frame
+
+
+def _options(seed):
+    rng = np.random.default_rng(seed)
+    ascending = [bool(flag) for flag in rng.integers(0, 2, len(BY))]
+    return ascending, ["first", "last"][seed % 2], int(rng.integers(0, 15))
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_top_and_bottom_k_match_sort_values(make_movies, seed):
+    frame = _with_nans(make_movies(seed, n=seed * 7), seed)
+    ascending, na_position, k = _options(seed)
+    ordered = frame.sort_values(
+        BY, ascending=ascending, na_position=na_position, kind="stable"
+    )
+    pd.testing.assert_frame_equal(
+        top_k(frame, BY, k, ascending, na_position), ordered.head(k)
+    )
+    pd.testing.assert_frame_equal(
+        bottom_k(frame, BY, k, ascending, na_position), ordered.tail(k)
+    )
+
+
+@pytest.mark.parametrize("select_rows", [1, 8, 4096])
+@pytest.mark.parametrize("seed", range(20))
+def test_top_k_by_matches_groupby_head(
+    make_movies, monkeypatch, seed, select_rows
+):
+    # Small thresholds send groups through the per-group partition path.
+    monkeypatch.setattr(ranking, "_SELECT_GROUP_ROWS", select_rows)
+    frame = _with_nans(make_movies(seed), seed)
+    ascending, na_position, k = _options(seed)
+    expected = (
+        frame.sort_values(
+            BY, ascending=ascending, na_position=na_position, kind="stable"
+        )
+        .groupby("release_year")
+        .head(k)
+    )
+    result = top_k_by(frame, "release_year", BY, k, ascending, na_position)
+    pd.testing.assert_frame_equal(result, expected)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_top_k_by_token_matches_exploded_groupby_head(make_movies, seed):
+    frame = _with_nans(make_movies(seed), seed)
+    ascending, na_position, k = _options(seed)
+    tokens = TokenIndex.from_series(frame["genres"])
+    matrix = tokens.matrix.tocsr()
+    exploded = frame.iloc[
+        np.repeat(np.arange(len(frame)), np.diff(matrix.indptr))
+    ].copy()
+    exploded["genre"] = np.asarray(tokens.vocabulary)[matrix.indices]
+    expected = (
+        exploded.sort_values(
+            BY, ascending=ascending, na_position=na_position, kind="stable"
+        )
+        .groupby("genre")
+        .head(k)
+    )
+    result = top_k_by_token(
+        frame, tokens, BY, k, ascending, na_position, name="genre"
+    )
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def _sorted(frame, by, ascending=True, na_position="last"):
+    return frame.sort_values(
+        by, ascending=ascending, na_position=na_position, kind="stable"
+    )
+
+
+def test_categories_rank_in_category_order():
+    # Not alphabetical: sort_values follows the order of the categories.
+    frame = pd.DataFrame(
+        {
+            "size": pd.Categorical(
+                ["m", None, "s", "l", "s", "m"], categories=["s", "m", "l"]
+            )
+        }
+    )
+    for na_position in ("first", "last"):
+        ordered = _sorted(frame, "size", False, na_position)
+        pd.testing.assert_frame_equal(
+            top_k(frame, "size", 3, False, na_position), ordered.head(3)
+        )
+
+
+def test_nullable_and_all_missing_keys():
+    frame = pd.DataFrame(
+        {
+            "votes": pd.array([3, None, 1, 3, None], dtype="Int64"),
+            "score": np.full(5, np.nan),
+            "title": ["b", "a", None, "c", "a"],
+        }
+    )
+    for by in (["votes", "title"], ["score", "title"], ["score"]):
+        for na_position in ("first", "last"):
+            ordered = _sorted(frame, by, na_position=na_position)
+            pd.testing.assert_frame_equal(
+                top_k(frame, by, 2, na_position=na_position), ordered.head(2)
+            )
+            pd.testing.assert_frame_equal(
+                bottom_k(frame, by, 2, na_position=na_position),
+                ordered.tail(2),
+            )
+
+
+def test_single_row_and_k_beyond_the_frame(make_movies):
+    frame = make_movies(0, n=1)
+    pd.testing.assert_frame_equal(top_k(frame, "revenue", 5), frame)
+    pd.testing.assert_frame_equal(
+        top_k_by(frame, "release_year", "revenue", 5), frame
+    )
+    frame = make_movies(1, n=30)
+    pd.testing.assert_frame_equal(
+        top_k_by(frame, "release_year", "revenue", 100),
+        _sorted(frame, "revenue"),
+    )
+
+
+def test_bad_arguments_raise(make_movies):
+    frame = make_movies(0)
+    with pytest.raises(ValueError):
+        top_k(frame, ["revenue", "budget"], 3, ascending=[True])
+    with pytest.raises(ValueError):
+        top_k(frame, "revenue", 3, na_position="middle")
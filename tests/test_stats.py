@@ -0,0 +1,103 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from tmdb import MovieStats, load_movies, stats_from_chunks, stats_from_csv
+from tmdb.stats import CORR_COLUMNS, DESCRIBE_COLUMNS
+from tmdb.synthetic import generate_csv
+
+# The frame holds float32 ratings, which pandas aggregates in float32.
+RTOL = 1e-6
+
+
+def _describe(frame, **kwargs):
+    return frame[DESCRIBE_COLUMNS].describe(**kwargs).astype(np.float64)
+
+
+def _split_counts(series):
+    tokens = series.astype(object).str.cat(sep="|").split("|")
+    return pd.Series(tokens).value_counts()
+
+
+def _chunks(frame, cuts):
+    bounds = [0, *cuts, len(frame)]
+    return [frame.iloc[a:b] for a, b in zip(bounds, bounds[1:])]
+
+
+@pytest.mark.parametrize("quantiles", [True, False])
+def test_merged_chunks_match_pandas(make_movies, quantiles):
+    frame = make_movies(0)
+    # Uneven chunks, one of them empty.
+    stats = stats_from_chunks(_chunks(frame, [3, 3, 120]), quantiles=quantiles)
+    pd.testing.assert_frame_equal(
+        stats.corr(), frame[CORR_COLUMNS].corr(), rtol=RTOL
+    )
+    if quantiles:
+        pd.testing.assert_frame_equal(
+            stats.describe(), _describe(frame), rtol=RTOL
+        )
+    pd.testing.assert_frame_equal(
+        stats.describe(percentiles=[]),
+        _describe(frame, percentiles=[]),
+        rtol=RTOL,
+    )
+    pd.testing.assert_series_equal(
+        stats.value_counts("genres"),
+        _split_counts(frame["genres"]),
+        check_index_type=False,
+    )
+
+
+def test_update_equals_building_from_all_rows(make_movies):
+    frame = make_movies(1)
+    stats = MovieStats.from_frame(frame.iloc[:50])
+    stats.update(frame.iloc[50:])
+    pd.testing.assert_frame_equal(
+        stats.describe(), _describe(frame), rtol=RTOL
+    )
+
+
+def test_single_row_has_no_spread(make_movies):
+    frame = make_movies(2, n=1)
+    stats = MovieStats.from_frame(frame)
+    pd.testing.assert_frame_equal(stats.describe(), _describe(frame))
+    pd.testing.assert_frame_equal(stats.corr(), frame[CORR_COLUMNS].corr())
+
+
+def test_empty_frame(make_movies):
+    frame = make_movies(3, n=0)
+    stats = MovieStats.from_frame(frame)
+    pd.testing.assert_frame_equal(stats.describe(), _describe(frame))
+    assert stats.value_counts("genres").empty
+
+
+def test_constant_column_does_not_correlate(make_movies):
+    frame = make_movies(4)
+    frame["release_year"] = np.int16(2010)
+    pd.testing.assert_frame_equal(
+        MovieStats.from_frame(frame).corr(),
+        frame[CORR_COLUMNS].corr(),
+        rtol=RTOL,
+    )
+
+
+def test_csv_statistics_describe_the_cleaned_movies(tmp_path):
+    path = tmp_path / "movies.csv"
+    generate_csv(path, rows=500, seed=5)
+    movies = load_movies(path)
+    stats = stats_from_csv(path, chunksize=64)
+    # Incomplete rows are dropped: this is not the table of cell [109].
+    assert stats.n == len(movies) < 500
+    pd.testing.assert_frame_equal(
+        stats.describe(), _describe(movies), rtol=RTOL
+    )
+
+
+def test_quantiles_need_value_tables(make_movies):
+    frame = make_movies(6)
+    with pytest.raises(ValueError):
+        MovieStats.from_frame(frame, quantiles=False).describe()
+    with pytest.raises(ValueError):
+        MovieStats.from_frame(frame).merge(
+            MovieStats.from_frame(frame, quantiles=False)
+        )
@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from tmdb import load_movies
+from tmdb.synthetic import COLUMNS, generate_csv
+
+INT32_MAX = np.iinfo(np.int32).max
+
+
+def _bytes(path):
+    with open(path, "rb") as source:
+        return source.read()
+
+
+def test_same_seed_gives_the_same_file(tmp_path):
+    first = generate_csv(tmp_path / "a.csv", rows=300, seed=3)
+    second = generate_csv(tmp_path / "b.csv", rows=300, seed=3)
+    other = generate_csv(tmp_path / "c.csv", rows=300, seed=4)
+    assert _bytes(first) == _bytes(second) != _bytes(other)
+
+
+def test_header_rows_and_chunks(tmp_path):
+    path = generate_csv(tmp_path / "movies.csv", rows=250, chunk_rows=64)
+    frame = pd.read_csv(path)
+    assert list(frame.columns) == COLUMNS and len(COLUMNS) == 21
+    assert len(frame) == 250
+    np.testing.assert_array_equal(frame["id"], np.arange(1, 251))
+    assert frame["vote_count"].min() >= 10
+    assert frame["budget"].between(0, 425e6).all()
+
+
+def test_zero_rows_write_only_the_header(tmp_path):
+    path = generate_csv(tmp_path / "movies.csv", rows=0)
+    with open(path) as source:
+        assert source.read().strip().split(",") == COLUMNS
+    assert load_movies(path).empty
+
+
+@pytest.mark.parametrize("fraction", [0.0, 0.2])
+def test_oversized_budgets(tmp_path, fraction):
+    path = generate_csv(
+        tmp_path / "movies.csv", rows=400, seed=1, oversized_budgets=fraction
+    )
+    budget = pd.read_csv(path)["budget"]
+    oversized = budget > INT32_MAX
+    assert oversized.any() == bool(fraction)
+    assert (budget[~oversized] <= 425e6).all()
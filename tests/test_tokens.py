@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from tmdb import TokenIndex
+
+
+def _split_counts(series, ascending=False):
+    """Cells [142]/[144]."""
+    tokens = series.astype(object).str.cat(sep="|").split("|")
+    return pd.Series(tokens).value_counts(ascending=ascending)
+
+
+@pytest.mark.parametrize("ascending", [False, True])
+@pytest.mark.parametrize("seed", range(5))
+def test_value_counts_match_str_split(make_movies, seed, ascending):
+    series = make_movies(seed)["production_companies"]
+    result = TokenIndex.from_series(series).value_counts(ascending=ascending)
+    pd.testing.assert_series_equal(
+        result, _split_counts(series, ascending), check_index_type=False
+    )
+
+
+def test_repeated_token_counts_twice_but_marks_the_movie_once():
+    series = pd.Series(["Drama|Drama|Crime", "Crime", "Drama"])
+    tokens = TokenIndex.from_series(series)
+    assert list(tokens.vocabulary) == ["Drama", "Crime"]
+    pd.testing.assert_series_equal(
+        tokens.value_counts(), _split_counts(series), check_index_type=False
+    )
+    np.testing.assert_array_equal(
+        tokens.matrix.toarray(), [[1, 1], [0, 1], [1, 0]]
+    )
+    table = tokens.aggregate(pd.Series([10.0, 20.0, 40.0]))
+    assert table.loc["Drama", "count"] == 2
+    assert table.loc["Drama", "sum"] == 50.0
+
+
+def test_missing_values_have_no_tokens():
+    series = pd.Series(["Drama|Crime", None, "Crime"], dtype="category")
+    tokens = TokenIndex.from_series(series)
+    assert tokens.matrix.shape == (3, 2)
+    assert tokens.matrix[1].nnz == 0
+    np.testing.assert_array_equal(tokens.rows_with("Crime"), [1, 0, 1])
+    pd.testing.assert_series_equal(
+        tokens.value_counts(), _split_counts(series), check_index_type=False
+    )
+
+
+def test_all_missing_column():
+    tokens = TokenIndex.from_series(pd.Series([None, None], dtype=object))
+    assert len(tokens) == 0
+    assert tokens.matrix.shape == (2, 0)
+    assert tokens.value_counts().empty
+    table = tokens.aggregate(pd.DataFrame({"revenue": [1.0, 2.0]}))
+    assert table.shape == (0, 3)
+
+
+def test_single_row():
+    tokens = TokenIndex.from_series(pd.Series(["Action|Comedy"]))
+    assert "Comedy" in tokens
+    assert tokens.top(1).to_dict() == {"Action": 1}
+    table = tokens.aggregate(pd.DataFrame({"revenue": [5.0]}))
+    np.testing.assert_array_equal(table[("revenue", "mean")], [5.0, 5.0])
+
+
+def test_unknown_token_and_misaligned_values_raise():
+    tokens = TokenIndex.from_series(pd.Series(["Drama", "Crime"]))
+    with pytest.raises(KeyError):
+        tokens.rows_with("Western")
+    with pytest.raises(ValueError):
+        tokens.aggregate(pd.Series([1.0]))
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_rows_with_and_aggregate_match_str_split(make_movies, seed):
+    frame = make_movies(seed)
+    tokens = TokenIndex.from_series(frame["genres"])
+    values = frame[["revenue", "vote_average"]]
+    table = tokens.aggregate(values)
+    fields = frame["genres"].astype(object).str.split("|")
+    for genre in tokens.vocabulary:
+        mask = fields.map(lambda field: genre in field).to_numpy()
+        np.testing.assert_array_equal(tokens.rows_with(genre), mask)
+        selected = values[mask]
+        assert table.loc[genre, ("revenue", "count")] == len(selected)
+        assert table.loc[genre, ("revenue", "sum")] == pytest.approx(
+            selected["revenue"].sum()
+        )
+        assert table.loc[genre, ("vote_average", "mean")] == pytest.approx(
+            selected["vote_average"].mean()
+        )
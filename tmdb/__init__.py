@@ -0,0 +1,32 @@
+"""Helpers behind the TMDb movies analysis.
+
+The notebook and TMDB-movies-Data-Analysis.py tell the story; this package
+holds the pieces that have to keep working once tmdb-movies.csv grows well
+past the 10,866 movies the analysis was first written against.
+"""
+
+from tmdb.cache import load_cached_movies
+from tmdb.cube import MovieCube
+from tmdb.loader import COLUMNS, SCHEMA, iter_movie_chunks, load_movies
+from tmdb.partnerships import PartnershipIndex
+from tmdb.ranking import bottom_k, top_k, top_k_by, top_k_by_token
+from tmdb.stats import MovieStats, stats_from_chunks, stats_from_csv
+from tmdb.tokens import TokenIndex
+
+__all__ = [
+    "COLUMNS",
+    "MovieCube",
+    "MovieStats",
+    "PartnershipIndex",
+    "SCHEMA",
+    "TokenIndex",
+    "bottom_k",
+    "iter_movie_chunks",
+    "load_cached_movies",
+    "load_movies",
+    "stats_from_chunks",
+    "stats_from_csv",
+    "top_k",
+    "top_k_by",
+    "top_k_by_token",
+]
@@ -0,0 +1,5 @@
+import sys
+
+from tmdb.pipeline import main
+
+sys.exit(main())
@@ -0,0 +1,650 @@
+"""Scaling benchmark of the analysis on synthetic TMDb files.
+
+Times every step of the original script (``read_csv``, the column drop and
+``dropna``, ``sort_values``, the ``str.cat``/``split`` value counts,
+``corr`` and each plot) and the ``tmdb`` replacements, on synthetic
+tmdb-movies.csv files of 10k, 1M, 10M... rows (see ``synthetic.py``). For
+each stage it records wall time and peak memory and writes a JSON report;
+``compare`` lines two reports up and flags regressions.
+
+    python -m tmdb.bench run --rows 10k 1m --report bench.json
+    python -m tmdb.bench compare baseline.json bench.json
+
+Peak memory is the process high-water mark (``VmHWM``) during the stage,
+reset before each one through ``/proc/self/clear_refs``. Where that is not
+available it falls back to the peak traced by ``tracemalloc``, which slows
+Python-heavy stages down; ``memory_method`` in the report says which was
+used.
+"""
+
+import argparse
+import datetime
+import gc
+import io
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+import matplotlib
+
+matplotlib.use("Agg")
+
+import matplotlib.pyplot as plt  # noqa: E402
+import seaborn as sns  # noqa: E402
+
+from tmdb import plots  # noqa: E402
+from tmdb.cache import load_cached_movies  # noqa: E402
+from tmdb.loader import load_movies  # noqa: E402
+from tmdb.ranking import bottom_k, top_k  # noqa: E402
+from tmdb.stats import CORR_COLUMNS, MovieStats  # noqa: E402
+from tmdb.synthetic import generate_csv  # noqa: E402
+from tmdb.tokens import TokenIndex  # noqa: E402
+
+DATA_DIR = "bench-data"
+REPORT_VERSION = 1
+
+# Columns dropped by cells [108] and [113].
+DROPPED = [
+    "id",
+    "imdb_id",
+    "popularity",
+    "original_title",
+    "cast",
+    "homepage",
+    "director",
+    "tagline",
+    "keywords",
+    "overview",
+    "runtime",
+    "release_date",
+]
+DROPPED_ADJ = ["budget_adj", "revenue_adj"]
+RANKING = ["revenue", "vote_average", "release_year"]
+
+# sns.pointplot bootstraps every distinct vote_count; beyond this many rows
+# it runs for a very long time, so it is skipped unless limits are lifted.
+POINTPLOT_MAX_ROWS = 200_000
+
+_SUFFIXES = [("g", 10**9), ("m", 10**6), ("k", 10**3)]
+
+
+def parse_rows(text):
+    """``"10k"`` -> 10000, ``"1m"`` -> 1000000, ``"2500"`` -> 2500."""
+    text = text.strip().lower().replace("_", "")
+    for suffix, size in _SUFFIXES:
+        if text.endswith(suffix):
+            return int(float(text[: -len(suffix)]) * size)
+    return int(text)
+
+
+def rows_label(rows):
+    """Inverse of ``parse_rows`` for round numbers."""
+    for suffix, size in _SUFFIXES:
+        if rows >= size and rows % size == 0:
+            return "%d%s" % (rows // size, suffix)
+    return str(rows)
+
+
+# -- memory ----------------------------------------------------------------
+
+
+def _status_kib(field):
+    with open("/proc/self/status") as status:
+        for line in status:
+            if line.startswith(field + ":"):
+                return int(line.split()[1])
+    raise OSError("%s not in /proc/self/status" % field)
+
+
+def _reset_high_water_mark():
+    with open("/proc/self/clear_refs", "w") as clear_refs:
+        clear_refs.write("5")
+
+
+class _PeakMemory:
+    """Peak memory of the code run between ``start`` and ``stop``."""
+
+    def __init__(self):
+        try:
+            _reset_high_water_mark()
+            _status_kib("VmHWM")
+            self.method = "vmhwm"
+        except OSError:
+            self.method = "tracemalloc"
+        self.before = 0
+
+    def start(self):
+        gc.collect()
+        if self.method == "vmhwm":
+            _reset_high_water_mark()
+            self.before = _status_kib("VmRSS") * 1024
+        else:
+            tracemalloc.start()
+
+    def stop(self):
+        if self.method == "vmhwm":
+            peak = _status_kib("VmHWM") * 1024
+            return {
+                "memory_method": self.method,
+                "rss_before_bytes": self.before,
+                "peak_rss_bytes": peak,
+                "peak_increase_bytes": max(0, peak - self.before),
+            }
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return {"memory_method": self.method, "peak_increase_bytes": peak}
+
+
+# -- stages ----------------------------------------------------------------
+#
+# A stage takes the ``state`` dict shared by the stages of one run and
+# stores whatever later stages need in it. Stages run in registration order.
+
+STAGES = []
+
+
+class BenchStage:
+    def __init__(self, name, func, max_rows=None):
+        self.name = name
+        self.suite = name.split(".", 1)[0]
+        self.func = func
+        self.max_rows = max_rows
+
+
+def bench_stage(name, max_rows=None):
+    def register(func):
+        STAGES.append(BenchStage(name, func, max_rows))
+        return func
+
+    return register
+
+
+def _render(fig):
+    """Render ``fig`` to PNG, as displaying it in the notebook would."""
+    fig.savefig(io.BytesIO(), format="png")
+    plt.close("all")
+
+
+@bench_stage("script.read_csv")
+def _read_csv(state):
+    state["raw"] = pd.read_csv(state["csv"])
+
+
+@bench_stage("script.drop_dropna")
+def _drop_dropna(state):
+    raw = state.pop("raw")
+    raw.drop(DROPPED, axis=1, inplace=True)
+    state["dropped"] = raw
+    df = raw.drop(DROPPED_ADJ, axis=1)
+    df.dropna(inplace=True)
+    state["df"] = df
+
+
+@bench_stage("script.hist_missing_genres")
+def _hist_missing_genres(state):
+    df = state["dropped"]
+    df[df.genres.isnull()].hist(figsize=(10, 8))
+    _render(plt.gcf())
+
+
+@bench_stage("script.hist_missing_companies")
+def _hist_missing_companies(state):
+    df = state.pop("dropped")
+    df[df.production_companies.isnull()].hist(figsize=(10, 8))
+    _render(plt.gcf())
+
+
+@bench_stage("script.hist")
+def _hist(state):
+    state["df"].hist(figsize=(10, 8))
+    _render(plt.gcf())
+
+
+@bench_stage("script.sort_values")
+def _sort_values(state):
+    state["df"].sort_values(by=RANKING, ascending=False, na_position="first")
+
+
+@bench_stage("script.scatter_budget_revenue")
+def _scatter_budget_revenue(state):
+    df = state["df"]
+    plt.figure()
+    plt.scatter(df["budget"], df["revenue"])
+    _render(plt.gcf())
+
+
+@bench_stage("script.pointplot_votes", max_rows=POINTPLOT_MAX_ROWS)
+def _pointplot_votes(state):
+    plt.figure()
+    sns.pointplot(x="vote_count", y="vote_average", data=state["df"])
+    _render(plt.gcf())
+
+
+def _str_cat_counts(df, column):
+    tokens = df[column].str.cat(sep="|").split("|")
+    return pd.Series(tokens).value_counts(ascending=True)
+
+
+def _barh(table, title):
+    plt.figure()
+    table[-10:].plot.barh().set(title=title)
+    _render(plt.gcf())
+
+
+@bench_stage("script.company_counts")
+def _company_counts(state):
+    state["companies"] = _str_cat_counts(state["df"], "production_companies")
+
+
+@bench_stage("script.barh_companies")
+def _barh_companies(state):
+    _barh(state.pop("companies"), "Most active Producers")
+
+
+@bench_stage("script.scatter_budget_rating")
+def _scatter_budget_rating(state):
+    df = state["df"]
+    plt.figure()
+    plt.scatter(df["budget"], df["vote_average"])
+    _render(plt.gcf())
+
+
+@bench_stage("script.genre_counts")
+def _genre_counts(state):
+    state["genres"] = _str_cat_counts(state["df"], "genres")
+
+
+@bench_stage("script.barh_genres")
+def _barh_genres(state):
+    _barh(state.pop("genres"), "Most Produced Genres")
+
+
+@bench_stage("script.corr")
+def _corr(state):
+    state["corr"] = state["df"][CORR_COLUMNS].corr()
+
+
+@bench_stage("script.heatmap")
+def _heatmap(state):
+    plt.figure()
+    sns.heatmap(state.pop("corr"), annot=True)
+    _render(plt.gcf())
+    del state["df"]
+
+
+@bench_stage("tmdb.load_movies")
+def _load_movies(state):
+    state["movies"] = load_movies(state["csv"])
+
+
+@bench_stage("tmdb.cache_cold")
+def _cache_cold(state):
+    load_cached_movies(state["csv"], state["cache_dir"])
+
+
+@bench_stage("tmdb.cache_warm")
+def _cache_warm(state):
+    load_cached_movies(state["csv"], state["cache_dir"])
+
+
+@bench_stage("tmdb.top_k")
+def _top_k(state):
+    df = state["movies"]
+    top_k(df, RANKING, 10, ascending=False, na_position="first")
+    bottom_k(df, RANKING, 10, ascending=False, na_position="first")
+
+
+@bench_stage("tmdb.company_counts")
+def _token_companies(state):
+    tokens = TokenIndex.from_series(state["movies"]["production_companies"])
+    tokens.value_counts(ascending=True)
+
+
+@bench_stage("tmdb.genre_counts")
+def _token_genres(state):
+    TokenIndex.from_series(state["movies"]["genres"]).value_counts()
+
+
+@bench_stage("tmdb.corr")
+def _stats_corr(state):
+    movies = state["movies"]
+    MovieStats.from_frame(movies, CORR_COLUMNS, (), quantiles=False).corr()
+
+
+@bench_stage("tmdb.density_budget_revenue")
+def _density_budget_revenue(state):
+    plt.figure()
+    plots.density_plot(state["movies"], "budget", "revenue")
+    _render(plt.gcf())
+
+
+@bench_stage("tmdb.binned_votes")
+def _binned_votes(state):
+    plt.figure()
+    plots.binned_pointplot(
+        state["movies"], "vote_count", "vote_average", logx=True
+    )
+    _render(plt.gcf())
+
+
+@bench_stage("tmdb.density_budget_rating")
+def _density_budget_rating(state):
+    plt.figure()
+    plots.density_plot(state.pop("movies"), "budget", "vote_average")
+    _render(plt.gcf())
+
+
+# -- runs and reports ------------------------------------------------------
+
+
+def _selected(stage, suites, skip):
+    if suites and stage.suite not in suites:
+        return False
+    return not any(pattern in stage.name for pattern in skip)
+
+
+def run_file(csv, rows, suites=(), skip=(), limits=True, log=None):
+    """Run the selected stages on ``csv`` (of ``rows`` movies).
+
+    Returns the report entry of the file: one record per stage with its
+    ``status`` (``ok``, ``skipped`` or ``error``), wall ``seconds`` and
+    memory figures.
+    """
+    log = log or (lambda line: None)
+    memory = _PeakMemory()
+    cache_dir = tempfile.mkdtemp(prefix="tmdb-bench-")
+    state = {"csv": csv, "cache_dir": cache_dir}
+    records = []
+    failed = set()
+    try:
+        for stage in STAGES:
+            if not _selected(stage, suites, skip):
+                continue
+            record = {"name": stage.name, "suite": stage.suite}
+            if limits and stage.max_rows is not None and rows > stage.max_rows:
+                record["status"] = "skipped"
+                record["reason"] = "more than %d rows" % stage.max_rows
+            elif stage.suite in failed:
+                record["status"] = "skipped"
+                record["reason"] = "an earlier stage of the suite failed"
+            else:
+                memory.start()
+                started = time.perf_counter()
+                try:
+                    stage.func(state)
+                except Exception as error:  # reported, not raised
+                    record["status"] = "error"
+                    record["error"] = "%s: %s" % (type(error).__name__, error)
+                    failed.add(stage.suite)
+                else:
+                    record["status"] = "ok"
+                record["seconds"] = time.perf_counter() - started
+                record.update(memory.stop())
+                plt.close("all")
+            records.append(record)
+            log(_format_record(record))
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+    return {
+        "rows": rows,
+        "csv": os.path.abspath(csv),
+        "csv_bytes": os.path.getsize(csv),
+        "stages": records,
+    }
+
+
+def _format_record(record):
+    if record["status"] == "skipped":
+        return "  %-34s skipped (%s)" % (record["name"], record["reason"])
+    line = "  %-34s %9.3fs %10.1f MiB" % (
+        record["name"],
+        record["seconds"],
+        record["peak_increase_bytes"] / 2**20,
+    )
+    if record["status"] == "error":
+        line += "  ERROR " + record["error"]
+    return line
+
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "cpus": os.cpu_count(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "matplotlib": matplotlib.__version__,
+        "seaborn": sns.__version__,
+    }
+
+
+def dataset(rows, data_dir=DATA_DIR, seed=0, log=None):
+    """Path of the synthetic file of ``rows`` movies, generated if missing."""
+    os.makedirs(data_dir, exist_ok=True)
+    path = os.path.join(
+        data_dir, "tmdb-movies-%s-seed%d.csv" % (rows_label(rows), seed)
+    )
+    if not os.path.exists(path):
+        if log:
+            log("generating %s" % path)
+        tmp = path + ".tmp"
+        generate_csv(tmp, rows, seed)
+        os.replace(tmp, path)
+    return path
+
+
+def run(
+    sizes,
+    data_dir=DATA_DIR,
+    seed=0,
+    suites=(),
+    skip=(),
+    limits=True,
+    log=None,
+):
+    """Benchmark every size in ``sizes``; returns the full report."""
+    report = {
+        "version": REPORT_VERSION,
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "seed": seed,
+        "environment": environment(),
+        "runs": [],
+    }
+    for rows in sizes:
+        csv = dataset(rows, data_dir, seed, log)
+        if log:
+            log("%s rows (%s)" % (rows_label(rows), csv))
+        report["runs"].append(run_file(csv, rows, suites, skip, limits, log))
+    return report
+
+
+def compare(baseline, current, tolerance=0.2, min_seconds=0.05):
+    """Stage-by-stage comparison of two reports.
+
+    Returns a frame with one row per (rows, stage) present in both, the
+    time and peak-memory ratios ``current / baseline`` and a ``regression``
+    flag for stages at least ``1 + tolerance`` times slower (ignoring stages
+    faster than ``min_seconds`` in both) or using that much more memory.
+    """
+
+    def table(report):
+        records = []
+        for entry in report["runs"]:
+            for record in entry["stages"]:
+                if record["status"] == "ok":
+                    records.append(
+                        {
+                            "rows": entry["rows"],
+                            "stage": record["name"],
+                            "seconds": record["seconds"],
+                            "memory": record["peak_increase_bytes"],
+                        }
+                    )
+        return pd.DataFrame(
+            records, columns=["rows", "stage", "seconds", "memory"]
+        ).set_index(["rows", "stage"])
+
+    joined = table(baseline).join(
+        table(current), lsuffix="_baseline", rsuffix="_current", how="inner"
+    )
+    joined["time_ratio"] = joined["seconds_current"] / joined[
+        "seconds_baseline"
+    ].clip(lower=1e-9)
+    joined["memory_ratio"] = joined["memory_current"] / joined[
+        "memory_baseline"
+    ].clip(lower=2**20)
+    slower = (joined["time_ratio"] >= 1 + tolerance) & (
+        joined[["seconds_baseline", "seconds_current"]].max(axis=1)
+        >= min_seconds
+    )
+    bigger = (joined["memory_ratio"] >= 1 + tolerance) & (
+        joined["memory_current"] - joined["memory_baseline"] >= 2**20
+    )
+    joined["regression"] = slower | bigger
+    return joined
+
+
+def _print_comparison(comparison):
+    with pd.option_context(
+        "display.width",
+        120,
+        "display.max_rows",
+        None,
+        "display.max_columns",
+        None,
+    ):
+        print(
+            comparison[
+                [
+                    "seconds_baseline",
+                    "seconds_current",
+                    "time_ratio",
+                    "memory_ratio",
+                    "regression",
+                ]
+            ].round(3)
+        )
+    regressions = int(comparison["regression"].sum())
+    print("%d regression(s)" % regressions)
+    return regressions
+
+
+def _load_report(path):
+    with open(path) as source:
+        report = json.load(source)
+    if report.get("version") != REPORT_VERSION:
+        raise ValueError("%s: unsupported report version" % path)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m tmdb.bench",
+        description="Benchmark the TMDb analysis on synthetic data.",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    generate = commands.add_parser(
+        "generate", help="write a synthetic tmdb-movies.csv"
+    )
+    generate.add_argument("--rows", default="10k", help="e.g. 10k, 1m, 10m")
+    generate.add_argument("--seed", type=int, default=0)
+    generate.add_argument(
+        "--oversized-budgets",
+        type=float,
+        default=0.0,
+        metavar="FRACTION",
+        help="budgets beyond the int32 range for this fraction of movies",
+    )
+    generate.add_argument("--out", default="tmdb-movies.csv")
+
+    bench = commands.add_parser("run", help="time each stage")
+    bench.add_argument(
+        "--rows",
+        nargs="+",
+        default=["10k"],
+        help="dataset sizes, e.g. 10k 1m 10m (generated on first use)",
+    )
+    bench.add_argument("--data-dir", default=DATA_DIR)
+    bench.add_argument("--seed", type=int, default=0)
+    bench.add_argument(
+        "--suite",
+        nargs="+",
+        choices=["script", "tmdb"],
+        default=[],
+        help="only run these suites (default: both)",
+    )
+    bench.add_argument(
+        "--skip",
+        nargs="+",
+        default=[],
+        metavar="PATTERN",
+        help="skip stages whose name contains PATTERN",
+    )
+    bench.add_argument(
+        "--no-limits",
+        action="store_true",
+        help="run stages even above their row limit (sns.pointplot)",
+    )
+    bench.add_argument("--report", default="bench.json")
+    bench.add_argument(
+        "--compare", metavar="BASELINE", help="report to compare against"
+    )
+    bench.add_argument("--tolerance", type=float, default=0.2)
+
+    check = commands.add_parser("compare", help="compare two reports")
+    check.add_argument("baseline")
+    check.add_argument("current")
+    check.add_argument("--tolerance", type=float, default=0.2)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "generate":
+        generate_csv(
+            args.out,
+            parse_rows(args.rows),
+            args.seed,
+            oversized_budgets=args.oversized_budgets,
+        )
+        print("wrote %s" % args.out)
+        return 0
+
+    if args.command == "compare":
+        comparison = compare(
+            _load_report(args.baseline),
+            _load_report(args.current),
+            args.tolerance,
+        )
+        return 1 if _print_comparison(comparison) else 0
+
+    report = run(
+        [parse_rows(rows) for rows in args.rows],
+        data_dir=args.data_dir,
+        seed=args.seed,
+        suites=args.suite,
+        skip=args.skip,
+        limits=not args.no_limits,
+        log=print,
+    )
+    with open(args.report, "w") as out:
+        json.dump(report, out, indent=2)
+    print("wrote %s" % args.report)
+    if args.compare:
+        comparison = compare(
+            _load_report(args.compare), report, args.tolerance
+        )
+        return 1 if _print_comparison(comparison) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
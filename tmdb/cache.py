@@ -0,0 +1,291 @@
+"""On-disk columnar cache of the cleaned movies frame.
+
+Every run of the analysis used to repeat the CSV parse and the cleaning of
+cells [107]-[114]. ``load_cached_movies`` does that work once and stores the
+result as one ``.npy`` file per column; later runs memory-map those files
+instead of parsing anything. Categories are stored the same way, as UTF-8
+bytes and offsets, and only the manifest is JSON. The one part of a warm
+start that grows with the file is turning those categories back into the
+Python strings pandas needs, about one per movie for the pipe-delimited
+columns.
+
+A cache entry is keyed by the content of the source file and by the cleaning
+parameters (``loader.COLUMNS`` and ``loader.SCHEMA``). Editing the CSV or the
+schema therefore selects a new entry, which is built on first use; the entry
+it replaces is removed. To avoid hashing the whole file on every warm start,
+the digest is remembered next to the file's size and mtime and only
+recomputed when one of those changes.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from tmdb.loader import (
+    COLUMNS,
+    CSV_PATH,
+    DEFAULT_MEMORY_BUDGET,
+    SCHEMA,
+    load_movies,
+)
+
+CACHE_DIR = ".tmdb-cache"
+
+# Bump when the on-disk layout changes.
+CACHE_VERSION = 2
+
+_MANIFEST = "manifest.json"
+_MASKED = (
+    pd.arrays.IntegerArray,
+    pd.arrays.FloatingArray,
+    pd.arrays.BooleanArray,
+)
+_SOURCES = "sources"
+_HASH_BLOCK = 2**20
+_STRING_BLOCK = 2**16
+
+
+def file_digest(path):
+    """Hex digest of the contents of ``path``."""
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as source:
+        for block in iter(lambda: source.read(_HASH_BLOCK), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _write_json(path, payload):
+    # Write next to the target then rename, so readers never see a partial
+    # file even when two runs race.
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    with os.fdopen(fd, "w") as out:
+        json.dump(payload, out)
+    os.replace(tmp, path)
+
+
+def _read_json(path):
+    try:
+        with open(path) as source:
+            return json.load(source)
+    except (OSError, ValueError):
+        return None
+
+
+def source_fingerprint(path, cache_dir=CACHE_DIR):
+    """Return ``{"path", "size", "mtime_ns", "digest"}`` for ``path``.
+
+    The digest of a file whose size and mtime have not changed since the last
+    call is read back from ``cache_dir`` instead of being recomputed.
+    """
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    sources = os.path.join(cache_dir, _SOURCES)
+    os.makedirs(sources, exist_ok=True)
+    name = hashlib.blake2b(path.encode(), digest_size=10).hexdigest()
+    record_path = os.path.join(sources, name + ".json")
+
+    record = _read_json(record_path)
+    if (
+        record is not None
+        and record.get("path") == path
+        and record.get("size") == stat.st_size
+        and record.get("mtime_ns") == stat.st_mtime_ns
+    ):
+        return record
+
+    record = {
+        "path": path,
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "digest": file_digest(path),
+    }
+    _write_json(record_path, record)
+    return record
+
+
+def cache_key(path=CSV_PATH, cache_dir=CACHE_DIR):
+    """Name of the cache entry holding the cleaned frame of ``path``."""
+    fingerprint = source_fingerprint(path, cache_dir)
+    params = {
+        "version": CACHE_VERSION,
+        "digest": fingerprint["digest"],
+        "columns": COLUMNS,
+        "schema": SCHEMA,
+    }
+    blob = json.dumps(params, sort_keys=True).encode()
+    return hashlib.blake2b(blob, digest_size=16).hexdigest()
+
+
+def _save_strings(prefix, strings):
+    """Save ``strings`` as NUL-terminated UTF-8 bytes plus their offsets.
+
+    ``<prefix>.text.npy`` holds the bytes and ``<prefix>.offsets.npy`` the
+    start of each string followed by the end of the last one.
+    """
+    encoded = [string.encode("utf-8") + b"\0" for string in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(item) for item in encoded], out=offsets[1:])
+    text = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+    np.save(prefix + ".text.npy", text)
+    np.save(prefix + ".offsets.npy", offsets)
+
+
+def _load_strings(prefix):
+    """The strings saved by ``_save_strings(prefix, ...)``."""
+    text = np.load(prefix + ".text.npy", mmap_mode="r")
+    offsets = np.load(prefix + ".offsets.npy", mmap_mode="r")
+    strings = []
+    # Decoding and splitting a block at a time creates the strings in C
+    # without holding a decoded copy of the whole file.
+    for first in range(0, len(offsets) - 1, _STRING_BLOCK):
+        last = min(first + _STRING_BLOCK, len(offsets) - 1)
+        start, stop = int(offsets[first]), int(offsets[last])
+        block = str(memoryview(text[start:stop]), "utf-8").split("\0")[:-1]
+        if len(block) != last - first:
+            # Some string contains a NUL itself; fall back to the offsets.
+            bounds = offsets[first : last + 1].tolist()
+            block = [
+                bytes(text[a : b - 1]).decode("utf-8")
+                for a, b in zip(bounds[:-1], bounds[1:])
+            ]
+        strings.extend(block)
+    return strings
+
+
+def write_frame(frame, entry, source=None):
+    """Store ``frame`` column by column in the directory ``entry``.
+
+    The directory is built under a temporary name and renamed into place, so
+    an interrupted write never leaves a half-populated entry behind.
+    """
+    parent = os.path.dirname(os.path.abspath(entry))
+    os.makedirs(parent, exist_ok=True)
+    tmp = tempfile.mkdtemp(dir=parent, prefix=".building-")
+    try:
+        manifest = {
+            "version": CACHE_VERSION,
+            "source": source,
+            "rows": len(frame),
+            "columns": {},
+        }
+        np.save(os.path.join(tmp, "index.npy"), frame.index.to_numpy())
+        for column in frame.columns:
+            values = frame[column]
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                np.save(
+                    os.path.join(tmp, column + ".codes.npy"),
+                    values.cat.codes.to_numpy(),
+                )
+                # Categories are about one per movie for the pipe-delimited
+                # columns, so they go to files of their own rather than
+                # into the manifest.
+                _save_strings(
+                    os.path.join(tmp, column + ".categories"),
+                    values.cat.categories,
+                )
+                manifest["columns"][column] = {"kind": "category"}
+            elif isinstance(values.array, _MASKED):
+                # Nullable columns of a frame read before cleaning.
+                array = values.array
+                np.save(
+                    os.path.join(tmp, column + ".npy"),
+                    array.to_numpy(array.dtype.numpy_dtype, na_value=0),
+                )
+                np.save(os.path.join(tmp, column + ".mask.npy"), array.isna())
+                manifest["columns"][column] = {
+                    "kind": "masked",
+                    "dtype": str(array.dtype),
+                }
+            else:
+                np.save(os.path.join(tmp, column + ".npy"), values.to_numpy())
+                manifest["columns"][column] = {"kind": "array"}
+        _write_json(os.path.join(tmp, _MANIFEST), manifest)
+        try:
+            os.rename(tmp, entry)
+        except OSError:
+            # Another run finished the same entry first; keep theirs.
+            if not os.path.exists(os.path.join(entry, _MANIFEST)):
+                raise
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def read_frame(entry):
+    """Open a cache entry, memory-mapping its columns read-only."""
+    manifest = _read_json(os.path.join(entry, _MANIFEST))
+    if manifest is None or manifest.get("version") != CACHE_VERSION:
+        raise FileNotFoundError("no usable cache entry at %r" % entry)
+
+    index = np.load(os.path.join(entry, "index.npy"), mmap_mode="r")
+    columns = {}
+    for column, spec in manifest["columns"].items():
+        if spec["kind"] == "category":
+            codes = np.load(
+                os.path.join(entry, column + ".codes.npy"), mmap_mode="r"
+            )
+            categories = _load_strings(
+                os.path.join(entry, column + ".categories")
+            )
+            dtype = pd.CategoricalDtype(categories)
+            columns[column] = pd.Categorical.from_codes(
+                codes, dtype=dtype, validate=False
+            )
+        elif spec["kind"] == "masked":
+            values = np.load(
+                os.path.join(entry, column + ".npy"), mmap_mode="r"
+            )
+            mask = np.load(
+                os.path.join(entry, column + ".mask.npy"), mmap_mode="r"
+            )
+            array_type = pd.api.types.pandas_dtype(
+                spec["dtype"]
+            ).construct_array_type()
+            columns[column] = array_type(values, mask)
+        else:
+            columns[column] = np.load(
+                os.path.join(entry, column + ".npy"), mmap_mode="r"
+            )
+    return pd.DataFrame(columns, index=pd.Index(index, copy=False), copy=False)
+
+
+def _prune(cache_dir, source, keep):
+    """Remove the entries of ``source`` other than ``keep``."""
+    for name in os.listdir(cache_dir):
+        entry = os.path.join(cache_dir, name)
+        if name in (keep, _SOURCES) or not os.path.isdir(entry):
+            continue
+        manifest = _read_json(os.path.join(entry, _MANIFEST))
+        if manifest is not None and manifest.get("source") == source:
+            shutil.rmtree(entry, ignore_errors=True)
+
+
+def load_cached_movies(
+    path=CSV_PATH,
+    cache_dir=CACHE_DIR,
+    memory_budget=DEFAULT_MEMORY_BUDGET,
+    chunksize=None,
+):
+    """Cleaned movies frame of ``path``, served from ``cache_dir``.
+
+    Same result as ``loader.load_movies``. On a cache miss the frame is
+    loaded with ``load_movies(path, memory_budget, chunksize)`` and written
+    to the cache, replacing any stale entry of the same file; on a hit the
+    columns are memory-mapped and nothing is parsed. The returned frame is
+    read-only; copy it before modifying it in place.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    source = os.path.abspath(path)
+    key = cache_key(path, cache_dir)
+    entry = os.path.join(cache_dir, key)
+    try:
+        return read_frame(entry)
+    except FileNotFoundError:
+        pass
+    write_frame(load_movies(path, memory_budget, chunksize), entry, source)
+    _prune(cache_dir, source, keep=key)
+    return read_frame(entry)
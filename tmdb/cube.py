@@ -0,0 +1,242 @@
+"""Pre-aggregated release_year x genre x company cube.
+
+The "over time" questions of the EDA (how revenue, budget and ratings move by
+year for a genre or a production company) each re-filter and re-aggregate
+the movies. ``MovieCube`` aggregates them once into every combination
+(cuboid) of the dimensions ``release_year``, ``genre`` and ``company``, keeping
+for each measure the count, sum, min, max and sum of squares. Those combine
+exactly, so slices, roll-ups (year to decade, genre to all genres) and
+drill-downs are answered from the cells without going back to the rows.
+
+A movie with several genres or companies contributes once to each of them.
+Rolling a token dimension up by summing cells would count those movies
+several times, which is why the cube keeps a cuboid per combination of
+dimensions instead of only the finest one.
+"""
+
+import itertools
+
+import numpy as np
+import pandas as pd
+
+MEASURES = ["budget", "revenue", "vote_count", "vote_average"]
+DIMENSIONS = ["release_year", "genre", "company"]
+
+_STATS = ["sum", "min", "max", "sumsq"]
+_COMBINE = {"sum": "sum", "min": "min", "max": "max", "sumsq": "sum"}
+
+_CHUNK_ROWS = 2**20
+
+
+def _expand(rows, tokens, extra):
+    """Repeat each (row, token) entry once per token of ``extra`` in its row.
+
+    ``rows``/``tokens`` list the non-zeros of one incidence matrix and
+    ``extra`` is a second CSR matrix over the same rows.
+    """
+    lengths = np.diff(extra.indptr)[rows]
+    starts = np.repeat(extra.indptr[rows], lengths)
+    offsets = np.arange(lengths.sum()) - np.repeat(
+        np.cumsum(lengths) - lengths, lengths
+    )
+    return (
+        np.repeat(rows, lengths),
+        np.repeat(tokens, lengths),
+        extra.indices[starts + offsets],
+    )
+
+
+def _entries(matrix):
+    rows = np.repeat(np.arange(matrix.shape[0]), np.diff(matrix.indptr))
+    return rows, matrix.indices
+
+
+def _aggregate(keys, values, measures):
+    """Cells of one cuboid for the rows described by ``keys``/``values``."""
+    table = pd.DataFrame(keys)
+    for k, measure in enumerate(measures):
+        table[measure] = values[:, k]
+        table[measure + "_sq"] = values[:, k] ** 2
+    spec = {"count": (measures[0], "size")}
+    for measure in measures:
+        spec[measure + "_sum"] = (measure, "sum")
+        spec[measure + "_min"] = (measure, "min")
+        spec[measure + "_max"] = (measure, "max")
+        spec[measure + "_sumsq"] = (measure + "_sq", "sum")
+    if not keys:
+        table["_all"] = 0
+        return table.groupby("_all").agg(**spec).reset_index(drop=True)
+    return table.groupby(list(keys)).agg(**spec)
+
+
+def _combine(cells, dims, measures):
+    """Merge partial cells that share the same coordinates."""
+    spec = {"count": "sum"}
+    for measure in measures:
+        for stat in _STATS:
+            spec[measure + "_" + stat] = _COMBINE[stat]
+    if not dims:
+        return cells.agg(spec).to_frame().T
+    return cells.groupby(level=list(dims)).agg(spec)
+
+
+def _all_dims():
+    """Every combination of ``DIMENSIONS``, in ``DIMENSIONS`` order."""
+    return [
+        dims
+        for size in range(len(DIMENSIONS) + 1)
+        for dims in itertools.combinations(DIMENSIONS, size)
+    ]
+
+
+class MovieCube:
+    """Aggregates of ``MEASURES`` for every combination of ``DIMENSIONS``.
+
+    ``cuboids`` maps a tuple of dimensions (in ``DIMENSIONS`` order) to a
+    frame indexed by those dimensions, with ``count`` and
+    ``<measure>_{sum,min,max,sumsq}`` columns. Genres and companies are kept
+    as ids in the vocabularies of their ``TokenIndex``.
+    """
+
+    def __init__(self, cuboids, genres, companies, measures=MEASURES):
+        self.cuboids = cuboids
+        self.genres = pd.Index(genres, dtype=object)
+        self.companies = pd.Index(companies, dtype=object)
+        self.measures = list(measures)
+
+    @classmethod
+    def build(
+        cls,
+        frame,
+        genres,
+        companies,
+        measures=MEASURES,
+        chunk_rows=_CHUNK_ROWS,
+    ):
+        """Aggregate ``frame`` once.
+
+        ``genres`` and ``companies`` are the ``TokenIndex`` of the two
+        pipe-delimited columns of ``frame``. Rows are processed
+        ``chunk_rows`` at a time and the partial cells merged, which bounds
+        the memory taken by the movie x genre x company expansion.
+        """
+        years = frame["release_year"].to_numpy()
+        values = frame[measures].to_numpy(dtype=np.float64)
+        with_year = [
+            dims for dims in _all_dims() if dims and dims[0] == "release_year"
+        ]
+        partial = {dims: [] for dims in with_year}
+        for start in range(0, max(len(frame), 1), chunk_rows):
+            stop = min(start + chunk_rows, len(frame))
+            genre_matrix = genres.matrix[start:stop]
+            company_matrix = companies.matrix[start:stop]
+            for dims in with_year:
+                if "genre" in dims and "company" in dims:
+                    rows, genre, company = _expand(
+                        *_entries(genre_matrix), company_matrix
+                    )
+                    keys = {"genre": genre, "company": company}
+                elif "genre" in dims:
+                    rows, genre = _entries(genre_matrix)
+                    keys = {"genre": genre}
+                elif "company" in dims:
+                    rows, company = _entries(company_matrix)
+                    keys = {"company": company}
+                else:
+                    rows, keys = np.arange(stop - start), {}
+                keys = {"release_year": years[start:stop][rows], **keys}
+                partial[dims].append(
+                    _aggregate(keys, values[start:stop][rows], measures)
+                )
+
+        cuboids = {}
+        for dims in with_year:
+            cuboids[dims] = _combine(pd.concat(partial[dims]), dims, measures)
+            # A movie has a single release year, so summing the years away
+            # gives the cuboid without them exactly.
+            cuboids[dims[1:]] = _combine(cuboids[dims], dims[1:], measures)
+        return cls(cuboids, genres.vocabulary, companies.vocabulary, measures)
+
+    def cuboid(self, dims):
+        """Cells of the cuboid over ``dims``, with token ids resolved."""
+        dims = tuple(d for d in DIMENSIONS if d in dims)
+        return self._labelled(self.cuboids[dims].reset_index())
+
+    def _labelled(self, cells):
+        if "genre" in cells:
+            cells["genre"] = self.genres.take(cells["genre"].to_numpy())
+        if "company" in cells:
+            cells["company"] = self.companies.take(cells["company"].to_numpy())
+        return cells
+
+    def query(self, by=(), genre=None, company=None, years=None):
+        """Aggregates for one slice of the cube, grouped by ``by``.
+
+        ``by`` lists output dimensions among ``release_year``, ``decade``,
+        ``genre`` and ``company``. ``genre`` and ``company`` fix a single
+        token and ``years`` an inclusive ``(first, last)`` range. Besides the
+        stored columns the result has ``<measure>_mean`` and
+        ``<measure>_std`` (sample standard deviation, as pandas computes it).
+
+        Action revenue per year between 1960 and 2015::
+
+            cube.query("release_year", genre="Action", years=(1960, 2015))
+
+        Mean rating of Marvel Studios movies per decade::
+
+            cube.query("decade", company="Marvel Studios")["vote_average_mean"]
+        """
+        by = [by] if isinstance(by, str) else list(by)
+        unknown = set(by) - set(DIMENSIONS) - {"decade"}
+        if unknown:
+            raise ValueError("unknown dimensions: %s" % sorted(unknown))
+
+        needed = {"release_year" if d == "decade" else d for d in by}
+        if years is not None:
+            needed.add("release_year")
+        if genre is not None:
+            needed.add("genre")
+        if company is not None:
+            needed.add("company")
+        dims = tuple(d for d in DIMENSIONS if d in needed)
+        cells = self.cuboids[dims]
+
+        mask = np.ones(len(cells), dtype=bool)
+        if genre is not None:
+            ids = cells.index.get_level_values("genre")
+            mask &= ids == self.genres.get_loc(genre)
+        if company is not None:
+            ids = cells.index.get_level_values("company")
+            mask &= ids == self.companies.get_loc(company)
+        if years is not None:
+            first, last = years
+            year = cells.index.get_level_values("release_year")
+            mask &= (year >= first) & (year <= last)
+        cells = cells[mask].reset_index()
+        if "decade" in by:
+            cells["decade"] = cells["release_year"] // 10 * 10
+
+        stored = ["count"] + [
+            measure + "_" + stat
+            for measure in self.measures
+            for stat in _STATS
+        ]
+        result = _combine(
+            cells.set_index(by)[stored] if by else cells[stored],
+            by,
+            self.measures,
+        )
+        if by:
+            result = self._labelled(result.reset_index()).set_index(by)
+        return self._derive(result)
+
+    def _derive(self, cells):
+        count = cells["count"].to_numpy(dtype=np.float64)
+        for measure in self.measures:
+            total = cells[measure + "_sum"].to_numpy()
+            squares = cells[measure + "_sumsq"].to_numpy()
+            with np.errstate(invalid="ignore", divide="ignore"):
+                cells[measure + "_mean"] = total / count
+                variance = (squares - total**2 / count) / (count - 1)
+            cells[measure + "_std"] = np.sqrt(np.maximum(variance, 0))
+        return cells
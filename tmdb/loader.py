@@ -0,0 +1,209 @@
+"""Column-pruned, typed and chunked loading of tmdb-movies.csv.
+
+Cells [107]-[114] of the analysis read every column of the file, drop the
+fourteen that are never used and then run ``dropna``. The functions here only
+parse the seven columns that survive that cleaning, give them a fixed compact
+schema and apply the null filter chunk by chunk, so the free-text columns
+(``overview``, ``cast``, ``keywords``...) never reach memory.
+"""
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+CSV_PATH = "tmdb-movies.csv"
+
+# Columns kept by cells [108] and [113], in the order they appear in the file.
+COLUMNS = [
+    "budget",
+    "revenue",
+    "genres",
+    "production_companies",
+    "vote_count",
+    "vote_average",
+    "release_year",
+]
+
+# Columns left by cell [108]. Cell [113] also drops the inflation-adjusted
+# ones, after the histograms of cells [111]/[112] have compared them with
+# ``budget`` and ``revenue``.
+RAW_COLUMNS = COLUMNS + ["budget_adj", "revenue_adj"]
+
+# Final dtypes of the cleaned frame. Budgets (at most 425,000,000) fit in an
+# int32; ``revenue`` stays int64 because the top grossers (Avatar:
+# 2,781,505,847) do not. ``clean_movies`` refuses values outside these
+# ranges rather than let the cast wrap them around.
+SCHEMA = {
+    "budget": "int32",
+    "revenue": "int64",
+    "genres": "category",
+    "production_companies": "category",
+    "vote_count": "int32",
+    "vote_average": "float32",
+    "release_year": "int16",
+}
+
+# Integer columns are parsed as nullable integers so a missing value is
+# dropped by the null filter instead of failing the parse.
+_READ_DTYPES = {
+    column: "Int64" if dtype.startswith("int") else dtype
+    for column, dtype in SCHEMA.items()
+}
+_RAW_DTYPES = {
+    **_READ_DTYPES,
+    "budget_adj": "float64",
+    "revenue_adj": "float64",
+}
+
+DEFAULT_MEMORY_BUDGET = 256 * 2**20
+
+_SAMPLE_ROWS = 1000
+
+
+def estimate_row_bytes(
+    path=CSV_PATH, sample_rows=_SAMPLE_ROWS, columns=COLUMNS
+):
+    """Estimate the in-memory size of one parsed row from a sample."""
+    sample = pd.read_csv(
+        path,
+        usecols=columns,
+        dtype={column: _RAW_DTYPES[column] for column in columns},
+        nrows=sample_rows,
+    )
+    if sample.empty:
+        return 1
+    # Categories are shared inside a chunk, so measuring them as plain
+    # strings overestimates on purpose: the budget is an upper bound.
+    sample = sample.astype(
+        {"genres": "object", "production_companies": "object"}
+    )
+    return max(1, int(sample.memory_usage(deep=True).sum() / len(sample)))
+
+
+def chunksize_for(
+    path=CSV_PATH, memory_budget=DEFAULT_MEMORY_BUDGET, columns=COLUMNS
+):
+    """Number of rows per chunk that keeps one parsed chunk under budget."""
+    if memory_budget <= 0:
+        raise ValueError("memory_budget must be positive")
+    return max(
+        1, memory_budget // estimate_row_bytes(path, columns=columns)
+    )
+
+
+def _check_ranges(frame):
+    """Raise if an integer column does not fit its ``SCHEMA`` dtype.
+
+    ``astype`` from the nullable parse dtype wraps such values silently, so
+    a 3,000,000,000 budget would become -1,294,967,296.
+    """
+    for column, dtype in SCHEMA.items():
+        if not dtype.startswith("int") or frame.empty:
+            continue
+        info = np.iinfo(dtype)
+        values = frame[column]
+        if values.min() < info.min or values.max() > info.max:
+            outside = values[(values < info.min) | (values > info.max)]
+            value, label = outside.iloc[0], outside.index[0]
+            raise ValueError(
+                "%s does not fit in %s: %d value(s), e.g. %d in row %r"
+                % (column, dtype, len(outside), value, label)
+            )
+
+
+def clean_movies(frame):
+    """Cells [113]-[114] on a frame of ``COLUMNS``: drop incomplete rows.
+
+    The result has the dtypes of ``SCHEMA`` and keeps the row labels of the
+    rows that survive. Raises ``ValueError`` if an integer value is out of
+    the range of its ``SCHEMA`` dtype.
+    """
+    frame = frame[COLUMNS].dropna()
+    _check_ranges(frame)
+    frame = frame.astype(SCHEMA)
+    for column, dtype in SCHEMA.items():
+        if dtype == "category":
+            frame[column] = frame[column].cat.remove_unused_categories()
+    return frame
+
+
+def iter_movie_chunks(
+    path=CSV_PATH,
+    memory_budget=DEFAULT_MEMORY_BUDGET,
+    chunksize=None,
+    clean=True,
+):
+    """Yield typed chunks of tmdb-movies.csv.
+
+    Each chunk keeps the row labels of the original file. With ``clean``
+    (the default) it holds ``COLUMNS`` and rows with a missing value are
+    removed by ``clean_movies``, like ``df.dropna()`` does; otherwise it
+    holds ``RAW_COLUMNS`` and integer columns use nullable dtypes.
+    ``chunksize`` overrides the value derived from ``memory_budget``.
+    """
+    columns = COLUMNS if clean else RAW_COLUMNS
+    if chunksize is None:
+        chunksize = chunksize_for(path, memory_budget, columns)
+    reader = pd.read_csv(
+        path,
+        usecols=columns,
+        dtype={column: _RAW_DTYPES[column] for column in columns},
+        chunksize=chunksize,
+    )
+    with reader:
+        for chunk in reader:
+            yield clean_movies(chunk) if clean else chunk[columns]
+
+
+def _concat_chunks(chunks, dtypes):
+    if not chunks:
+        return pd.DataFrame(
+            {
+                column: pd.Series(dtype=dtype)
+                for column, dtype in dtypes.items()
+            },
+            index=pd.Index([], dtype=np.int64),
+        )
+    columns = {}
+    for column, dtype in dtypes.items():
+        parts = [chunk[column] for chunk in chunks]
+        if dtype == "category":
+            # Every chunk has its own categories; unify them instead of
+            # letting concat fall back to object dtype.
+            columns[column] = union_categoricals(parts, sort_categories=True)
+        else:
+            columns[column] = pd.concat(parts, ignore_index=True).array
+    index = np.concatenate([chunk.index.to_numpy() for chunk in chunks])
+    return pd.DataFrame(columns, index=index)[list(dtypes)]
+
+
+def read_movies(
+    path=CSV_PATH, memory_budget=DEFAULT_MEMORY_BUDGET, chunksize=None
+):
+    """``RAW_COLUMNS`` of tmdb-movies.csv, missing values kept.
+
+    This is the frame of cell [108], which cells [109], [111] and [112]
+    describe and look at to see where genres and production companies are
+    missing; ``clean_movies`` turns it into the result of ``load_movies``.
+    """
+    chunks = list(iter_movie_chunks(path, memory_budget, chunksize, False))
+    return _concat_chunks(chunks, _RAW_DTYPES)
+
+
+def load_movies(
+    path=CSV_PATH, memory_budget=DEFAULT_MEMORY_BUDGET, chunksize=None
+):
+    """Load the cleaned movies frame of cells [108]-[114].
+
+    The values and row labels match::
+
+        df = pd.read_csv(path)
+        df.drop([...], axis=1, inplace=True)  # cells [108] and [113]
+        df.dropna(inplace=True)               # cell [114]
+
+    but with the compact dtypes of ``SCHEMA``. ``memory_budget`` (bytes)
+    bounds the size of each parsed chunk; the result itself is smaller than
+    the frame cell [114] produces.
+    """
+    chunks = list(iter_movie_chunks(path, memory_budget, chunksize))
+    return _concat_chunks(chunks, SCHEMA)
@@ -0,0 +1,274 @@
+"""Co-production partnerships between production companies.
+
+The Conclusions ask which production companies succeed *together*, while
+cell [144] only counts companies one at a time. Here the movie x company
+incidence matrix ``M`` of a ``TokenIndex`` gives the company x company
+co-occurrence counts as ``M.T @ M`` and the summed metrics of each pair as
+``M.T @ (v * M)``, all in one product and without leaving sparse storage: a
+pair only exists if the two companies share at least one movie.
+
+``PartnershipIndex`` keeps the resulting pairs sorted by key so single pairs
+and the partners of one company are looked up without touching the frame.
+"""
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from tmdb.tokens import TokenIndex
+
+METRICS = ["revenue", "budget", "vote_average"]
+
+
+def _top_positions(values, k):
+    """Positions of the ``k`` largest ``values``, largest first.
+
+    Ties are broken by position so the result is deterministic; NaN ranks
+    last.
+    """
+    if k <= 0:
+        return np.arange(0)
+    values = np.where(np.isnan(values), -np.inf, values)
+    if k < len(values):
+        kth = np.partition(values, len(values) - k)[len(values) - k]
+        candidates = np.flatnonzero(values >= kth)
+    else:
+        candidates = np.arange(len(values))
+    order = np.lexsort((candidates, -values[candidates]))
+    return candidates[order][:k]
+
+
+class PartnershipIndex:
+    """Statistics of every pair of companies that share a movie.
+
+    Pairs are stored once, with ``first < second`` (ids in the company
+    vocabulary), and ``stats`` holds one row per pair: ``count`` (movies made
+    together) and ``<metric>_sum`` / ``<metric>_mean`` for each metric.
+    """
+
+    def __init__(self, vocabulary, first, second, stats):
+        self.vocabulary = pd.Index(vocabulary, dtype=object)
+        self.first = np.asarray(first, dtype=np.int64)
+        self.second = np.asarray(second, dtype=np.int64)
+        self.stats = stats.reset_index(drop=True)
+        self._keys = self.first * len(self.vocabulary) + self.second
+        self._by_second = None
+        self._movies = None
+        self._groups = {}
+
+    @classmethod
+    def build(cls, companies, frame, metrics=METRICS, rows=None):
+        """Index the partnerships of ``companies`` (a ``TokenIndex``).
+
+        ``frame`` is the movies frame the token index was built from, so its
+        rows line up positionally with ``companies.matrix``. ``rows`` (mask
+        or positions) restricts the index to a subset of the movies.
+        """
+        matrix = companies.matrix.astype(np.float64)
+        values = frame[metrics].to_numpy(dtype=np.float64)
+        selected = np.ones(matrix.shape[0], dtype=bool)
+        if rows is not None:
+            selected[:] = False
+            selected[rows] = True
+        index = cls._from_movies(
+            companies.vocabulary, matrix[selected], values[selected], metrics
+        )
+        # Kept for by_group, which indexes subsets of the same movies.
+        index._movies = (matrix, values, selected, list(metrics))
+        return index
+
+    @classmethod
+    def _from_movies(cls, vocabulary, matrix, values, metrics):
+        n_companies = matrix.shape[1]
+        transposed = matrix.T.tocsr()
+        # The counts and the sums of every metric come out of one product:
+        # the right-hand side is [M, v_1 * M, ..., v_m * M], so block 0 of
+        # the result is M.T @ M and block k + 1 is M.T @ (v_k * M).
+        blocks = [matrix] + [
+            sparse.diags(values[:, k]) @ matrix for k in range(len(metrics))
+        ]
+        product = (transposed @ sparse.hstack(blocks, format="csr")).tocoo()
+
+        row = product.row.astype(np.int64)
+        block, second = np.divmod(product.col.astype(np.int64), n_companies)
+        upper = row < second
+        keys = row[upper] * n_companies + second[upper]
+        block, data = block[upper], product.data[upper]
+        in_block = block == 0
+        order = np.argsort(keys[in_block], kind="stable")
+        pairs = keys[in_block][order]
+        count = data[in_block][order]
+        first, second = np.divmod(pairs, n_companies)
+
+        stats = {"count": count.astype(np.int64)}
+        for k, metric in enumerate(metrics):
+            # The product drops pairs whose sum is exactly zero; those keep
+            # the zero they start with.
+            in_block = block == k + 1
+            sums = np.zeros(len(pairs))
+            sums[np.searchsorted(pairs, keys[in_block])] = data[in_block]
+            stats[metric + "_sum"] = sums
+            stats[metric + "_mean"] = sums / count
+        return cls(vocabulary, first, second, pd.DataFrame(stats))
+
+    def by_group(self, name, groups=None):
+        """One ``PartnershipIndex`` per group of movies, cached as ``name``.
+
+        ``groups`` is a ``TokenIndex`` over the movies of ``build`` (one
+        group per token, e.g. the genres), labels aligned with those movies
+        (e.g. ``df["release_year"]``), or a mapping of label to rows (mask
+        or positions). The indexes are built on the first call for ``name``;
+        later calls return them without touching the movies again and may
+        leave ``groups`` out.
+        """
+        if name in self._groups:
+            return self._groups[name]
+        if groups is None:
+            raise KeyError(name)
+        if self._movies is None:
+            raise ValueError("by_group needs an index made by build()")
+        matrix, values, selected, metrics = self._movies
+        indexes = {}
+        for label, rows in _group_rows(groups).items():
+            in_group = np.zeros(len(selected), dtype=bool)
+            in_group[rows] = True
+            in_group &= selected
+            indexes[label] = self._from_movies(
+                self.vocabulary, matrix[in_group], values[in_group], metrics
+            )
+        self._groups[name] = indexes
+        return indexes
+
+    def top_by_group(self, name, k=10, by="count", groups=None):
+        """Top ``k`` partnerships within each group of ``by_group(name)``.
+
+        The groups are labelled in a first column called ``name``.
+        """
+        tables = []
+        for value, index in self.by_group(name, groups).items():
+            table = index.top(k, by)
+            table.insert(0, name, value)
+            tables.append(table)
+        if not tables:
+            empty = self.to_frame(np.arange(0))
+            empty.insert(0, name, pd.Series(dtype=object))
+            return empty
+        return pd.concat(tables, ignore_index=True)
+
+    def __len__(self):
+        return len(self.first)
+
+    def _id(self, company):
+        return self.vocabulary.get_loc(company)
+
+    def to_frame(self, positions=None):
+        """Pairs as a frame with ``company_a`` and ``company_b`` names."""
+        if positions is None:
+            positions = np.arange(len(self))
+        names = np.asarray(self.vocabulary, dtype=object)
+        result = pd.DataFrame(
+            {
+                "company_a": names[self.first[positions]],
+                "company_b": names[self.second[positions]],
+            }
+        )
+        stats = self.stats.iloc[positions].reset_index(drop=True)
+        return pd.concat([result, stats], axis=1)
+
+    def pair(self, a, b):
+        """Statistics of the partnership of companies ``a`` and ``b``.
+
+        Raises ``KeyError`` if either company is unknown or the two never
+        produced a movie together.
+        """
+        i, j = sorted((self._id(a), self._id(b)))
+        key = i * len(self.vocabulary) + j
+        position = np.searchsorted(self._keys, key)
+        if i == j or position == len(self) or self._keys[position] != key:
+            raise KeyError((a, b))
+        return self.stats.iloc[position]
+
+    def partners(self, company, k=None, by="count"):
+        """Partners of ``company``, best ``k`` first by column ``by``."""
+        if self._by_second is None:
+            self._by_second = np.argsort(self.second, kind="stable")
+        i = self._id(company)
+        as_first = np.arange(
+            np.searchsorted(self.first, i, side="left"),
+            np.searchsorted(self.first, i, side="right"),
+        )
+        seconds = self.second[self._by_second]
+        as_second = self._by_second[
+            np.searchsorted(seconds, i, side="left") : np.searchsorted(
+                seconds, i, side="right"
+            )
+        ]
+        positions = np.concatenate([as_first, as_second])
+        ranked = _top_positions(
+            self.stats[by].to_numpy(dtype=np.float64)[positions],
+            len(positions) if k is None else k,
+        )
+        positions = positions[ranked]
+
+        names = np.asarray(self.vocabulary, dtype=object)
+        other = np.where(
+            self.first[positions] == i,
+            self.second[positions],
+            self.first[positions],
+        )
+        result = pd.DataFrame({"partner": names[other]})
+        stats = self.stats.iloc[positions].reset_index(drop=True)
+        return pd.concat([result, stats], axis=1)
+
+    def top(self, k=10, by="count"):
+        """The ``k`` best partnerships by column ``by`` of ``stats``."""
+        values = self.stats[by].to_numpy(dtype=np.float64)
+        return self.to_frame(_top_positions(values, k))
+
+
+def _group_rows(groups):
+    """Label -> rows mapping of the ``groups`` argument of ``by_group``."""
+    if isinstance(groups, TokenIndex):
+        return {token: groups.rows_with(token) for token in groups.vocabulary}
+    if isinstance(groups, dict):
+        return groups
+    labels = np.asarray(groups)
+    order = np.argsort(labels, kind="stable")
+    unique, starts = np.unique(labels[order], return_index=True)
+    return dict(zip(unique.tolist(), np.split(order, starts[1:])))
+
+
+def partnerships_by(companies, frame, groups, metrics=METRICS):
+    """One ``PartnershipIndex`` per group of movies.
+
+    ``groups`` maps a label to the rows (mask or positions) of the movies in
+    that group.
+    """
+    index = PartnershipIndex.build(companies, frame, metrics)
+    return index.by_group("groups", groups)
+
+
+def top_partnerships_by_genre(
+    companies, genres, frame, k=10, by="count", metrics=METRICS
+):
+    """Top ``k`` partnerships within the movies of each genre token.
+
+    This builds the indexes for one answer; to rank several ways, keep a
+    ``PartnershipIndex`` and call its ``top_by_group("genre", ...)``.
+    """
+    index = PartnershipIndex.build(companies, frame, metrics)
+    return index.top_by_group("genre", k, by, genres)
+
+
+def top_partnerships_by_year(
+    companies, frame, k=10, by="count", metrics=METRICS
+):
+    """Top ``k`` partnerships within the movies of each ``release_year``.
+
+    As for ``top_partnerships_by_genre``, ``top_by_group`` on a kept index
+    answers further questions from the cached per-year indexes.
+    """
+    index = PartnershipIndex.build(companies, frame, metrics)
+    return index.top_by_group(
+        "release_year", k, by, frame["release_year"].to_numpy()
+    )
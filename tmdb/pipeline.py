@@ -0,0 +1,639 @@
+"""Headless, cached stage pipeline for the TMDb analysis.
+
+The notebook export ran top to bottom inside Jupyter (``get_ipython``) and
+ended by shelling out to ``nbconvert``. Here each step of the analysis is a
+named stage with explicit dependencies:
+
+    load -> clean -> genre_tokens / company_tokens -> *_counts
+                  -> rankings, correlations
+    figures hang off whichever stage they draw
+
+Every stage's result is stored under ``<cache_dir>/stages`` with a key
+derived from the stage's code and the ``tmdb`` code it calls, its parameters
+and the keys of its inputs (the ``load`` stage also hashes tmdb-movies.csv,
+see ``cache.py``). A rerun
+therefore only recomputes the stages downstream of what changed. Stages whose
+inputs are ready run concurrently in a process pool; workers read their
+inputs from the stage cache rather than receiving them from the parent. The
+movie frames of ``load`` and ``clean`` are stored column by column with
+``cache.write_frame``, so every worker memory-maps the same pages instead of
+unpickling a private copy; the other, small results are pickled.
+
+Run it with ``python -m tmdb`` (see ``main`` for the options).
+"""
+
+import argparse
+import concurrent.futures
+import hashlib
+import inspect
+import json
+import math
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+import seaborn as sns
+from matplotlib.figure import Figure
+
+from tmdb import plots
+from tmdb.cache import (
+    CACHE_DIR,
+    CACHE_VERSION,
+    read_frame,
+    source_fingerprint,
+    write_frame,
+)
+from tmdb.loader import (
+    CSV_PATH,
+    DEFAULT_MEMORY_BUDGET,
+    RAW_COLUMNS,
+    SCHEMA,
+    clean_movies,
+    read_movies,
+)
+from tmdb.ranking import bottom_k, top_k
+from tmdb.stats import CORR_COLUMNS
+from tmdb.tokens import TokenIndex
+
+OUTPUT_DIR = "output"
+
+# Sort keys of the ranking in cell [116].
+RANKING = ["revenue", "vote_average", "release_year"]
+
+
+class Stage:
+    """A step of the analysis.
+
+    ``func`` receives the results of ``deps`` positionally and the values of
+    ``params`` as keyword arguments; figure stages also get the ``path`` of
+    the PNG to write. ``output`` is ``"csv"`` for tables exported by the
+    command line, ``"png"`` for figures and ``None`` otherwise. The result
+    of a ``columnar`` stage is a frame stored in ``.npy`` columns that later
+    stages memory-map read-only.
+    """
+
+    def __init__(
+        self, name, func, deps=(), params=(), output=None, columnar=False
+    ):
+        self.name = name
+        self.func = func
+        self.deps = tuple(deps)
+        self.params = tuple(params)
+        self.output = output
+        self.columnar = columnar
+
+    def __repr__(self):
+        return "Stage(%r, deps=%r)" % (self.name, self.deps)
+
+
+STAGES = {}
+
+
+def stage(name, deps=(), params=(), output=None, columnar=False):
+    """Register the decorated function as the stage ``name``."""
+
+    def register(func):
+        STAGES[name] = Stage(name, func, deps, params, output, columnar)
+        return func
+
+    return register
+
+
+# -- stages ----------------------------------------------------------------
+
+
+@stage("load", params=("csv", "memory_budget"), columnar=True)
+def load(csv, memory_budget):
+    """Cells [107]-[108]: the columns cell [108] keeps, incomplete rows too."""
+    return read_movies(csv, memory_budget)
+
+
+@stage("describe", deps=("load",), output="csv")
+def describe(raw):
+    """Cell [109]."""
+    return raw.describe()
+
+
+@stage("clean", deps=("load",), columnar=True)
+def clean(raw):
+    """Cells [113]-[114]."""
+    return clean_movies(raw)
+
+
+@stage("genre_tokens", deps=("clean",))
+def genre_tokens(df):
+    return TokenIndex.from_series(df["genres"])
+
+
+@stage("company_tokens", deps=("clean",))
+def company_tokens(df):
+    return TokenIndex.from_series(df["production_companies"])
+
+
+@stage("rankings", deps=("clean",), params=("top",), output="csv")
+def rankings(df, top):
+    """Cell [116]: the first and last ``top`` movies of the ranking."""
+    return pd.concat(
+        [
+            top_k(df, RANKING, top, ascending=False, na_position="first"),
+            bottom_k(df, RANKING, top, ascending=False, na_position="first"),
+        ]
+    )
+
+
+@stage("company_counts", deps=("company_tokens",), output="csv")
+def company_counts(companies):
+    """Cell [144]."""
+    return companies.value_counts()
+
+
+@stage("genre_counts", deps=("genre_tokens",), output="csv")
+def genre_counts(genres):
+    """Cell [142]."""
+    return genres.value_counts()
+
+
+@stage("correlations", deps=("clean",), output="csv")
+def correlations(df):
+    """Cell [138]."""
+    return df[CORR_COLUMNS].corr()
+
+
+def _histograms(fig, frame):
+    """``frame.hist()`` drawn on ``fig``, without going through pyplot."""
+    columns = [
+        column
+        for column in frame.columns
+        if pd.api.types.is_numeric_dtype(frame[column].dtype)
+    ]
+    ncols = max(1, math.ceil(math.sqrt(len(columns))))
+    nrows = max(1, math.ceil(len(columns) / ncols))
+    axes = np.atleast_1d(fig.subplots(nrows, ncols)).ravel()
+    for ax, column in zip(axes, columns):
+        values = frame[column].to_numpy(dtype=np.float64, na_value=np.nan)
+        ax.hist(values[~np.isnan(values)], bins=10)
+        ax.set_title(column)
+        ax.grid(True)
+    for ax in axes[len(columns) :]:
+        ax.set_visible(False)
+
+
+def _save(fig, path):
+    fig.savefig(path)
+    return path
+
+
+@stage("missing_genres", deps=("load",), output="png")
+def missing_genres(raw, path):
+    """Cell [111]."""
+    fig = Figure(figsize=(10, 8))
+    _histograms(fig, raw[raw["genres"].isna()])
+    return _save(fig, path)
+
+
+@stage("missing_companies", deps=("load",), output="png")
+def missing_companies(raw, path):
+    """Cell [112]."""
+    fig = Figure(figsize=(10, 8))
+    _histograms(fig, raw[raw["production_companies"].isna()])
+    return _save(fig, path)
+
+
+@stage("histograms", deps=("clean",), output="png")
+def histograms(df, path):
+    """Cell [115]."""
+    fig = Figure(figsize=(10, 8))
+    _histograms(fig, df)
+    return _save(fig, path)
+
+
+@stage("budget_revenue", deps=("clean",), output="png")
+def budget_revenue(df, path):
+    """Cell [121]."""
+    fig = Figure()
+    ax = plots.density_plot(df, "budget", "revenue", ax=fig.subplots())
+    ax.set(xlabel="Budget", ylabel="Revenue")
+    return _save(fig, path)
+
+
+@stage("votes", deps=("clean",), output="png")
+def votes(df, path):
+    """Cell [170]."""
+    fig = Figure()
+    ax = fig.subplots()
+    plots.binned_pointplot(df, "vote_count", "vote_average", logx=True, ax=ax)
+    ax.grid(True)
+    return _save(fig, path)
+
+
+@stage("top_producers", deps=("company_counts",), output="png")
+def top_producers(counts, path):
+    """Cell [144]."""
+    fig = Figure()
+    ax = fig.subplots()
+    table = counts.head(10)[::-1]
+    ax.barh(table.index, table.to_numpy())
+    ax.set(title="Most active Producers", xlabel="Top Producers")
+    fig.tight_layout()
+    return _save(fig, path)
+
+
+@stage("budget_rating", deps=("clean",), output="png")
+def budget_rating(df, path):
+    """Cell [157]."""
+    fig = Figure()
+    ax = plots.density_plot(df, "budget", "vote_average", ax=fig.subplots())
+    ax.set(xlabel="Financial Performance", ylabel="Ratings")
+    return _save(fig, path)
+
+
+@stage("top_genres", deps=("genre_counts",), output="png")
+def top_genres(counts, path):
+    """Cell [142]."""
+    fig = Figure()
+    ax = fig.subplots()
+    table = counts.head(10)[::-1]
+    ax.barh(table.index, table.to_numpy())
+    ax.set(title="Most Produced Genres", xlabel="genres")
+    fig.tight_layout()
+    return _save(fig, path)
+
+
+@stage("corr_heatmap", deps=("correlations",), output="png")
+def corr_heatmap(corr, path):
+    """Cell [138]."""
+    fig = Figure()
+    sns.heatmap(corr, annot=True, ax=fig.subplots())
+    fig.tight_layout()
+    return _save(fig, path)
+
+
+# -- runner ----------------------------------------------------------------
+
+
+def _ordered(names):
+    """``names`` and all their dependencies, dependencies first."""
+    order, seen = [], set()
+
+    def visit(name):
+        if name in seen:
+            return
+        seen.add(name)
+        for dep in STAGES[name].deps:
+            visit(dep)
+        order.append(name)
+
+    for name in names:
+        visit(name)
+    return order
+
+
+def _global_names(code):
+    """Global names used by ``code`` and the code nested in it."""
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if inspect.iscode(const):
+            names |= _global_names(const)
+    return names
+
+
+def _tmdb_module(value):
+    """The ``tmdb`` module ``value`` is or was defined in, if any."""
+    name = value.__name__ if inspect.ismodule(value) else None
+    if name is None:
+        name = getattr(value, "__module__", None)
+    if isinstance(name, str) and name.split(".")[0] == "tmdb":
+        return sys.modules.get(name)
+    return None
+
+
+def _code_payload(func, digests):
+    """What a stage's result depends on in the code, besides its inputs.
+
+    That is the source of ``func`` and of the helpers of this module it
+    calls, the values of the constants they use and a digest of every other
+    ``tmdb`` module they reach, directly or through the modules' imports.
+    ``digests`` memoizes module digests across stages.
+    """
+    sources, constants, modules = {}, {}, []
+    pending = [func]
+    while pending:
+        current = pending.pop()
+        if current.__qualname__ in sources:
+            continue
+        sources[current.__qualname__] = inspect.getsource(current)
+        for name in sorted(_global_names(current.__code__)):
+            if name not in current.__globals__:
+                continue
+            value = current.__globals__[name]
+            module = _tmdb_module(value)
+            if module is None:
+                if isinstance(value, (str, int, float, list, tuple, dict)):
+                    constants[name] = repr(value)
+            elif module.__name__ != __name__:
+                modules.append(module)
+            elif inspect.isfunction(value):
+                pending.append(value)
+
+    reached = set()
+    while modules:
+        module = modules.pop()
+        if module.__name__ in reached:
+            continue
+        reached.add(module.__name__)
+        if module.__name__ not in digests:
+            source = inspect.getsource(module).encode()
+            digests[module.__name__] = hashlib.blake2b(
+                source, digest_size=16
+            ).hexdigest()
+        for value in vars(module).values():
+            other = _tmdb_module(value)
+            if other is not None and other.__name__ != __name__:
+                modules.append(other)
+    return {
+        "sources": sources,
+        "constants": constants,
+        "modules": {name: digests[name] for name in sorted(reached)},
+    }
+
+
+def stage_keys(names, params, cache_dir=CACHE_DIR):
+    """Cache key of each stage needed for ``names``.
+
+    A key changes with the stage's code and the ``tmdb`` code it calls (see
+    ``_code_payload``), its parameters, the keys of its inputs and, for the
+    stages reading tmdb-movies.csv, the file's contents and the loader's
+    columns and schema. Columnar stages also depend on the version of the
+    on-disk layout of ``tmdb.cache``.
+    """
+    keys, digests = {}, {}
+    for name in _ordered(names):
+        current = STAGES[name]
+        payload = {
+            "stage": name,
+            "code": _code_payload(current.func, digests),
+            "params": {p: params[p] for p in current.params},
+            "deps": [keys[dep] for dep in current.deps],
+        }
+        if "csv" in current.params:
+            fingerprint = source_fingerprint(params["csv"], cache_dir)
+            payload["source"] = fingerprint["digest"]
+            payload["columns"] = RAW_COLUMNS
+            payload["schema"] = SCHEMA
+        if current.columnar:
+            payload["layout"] = CACHE_VERSION
+        blob = json.dumps(payload, sort_keys=True).encode()
+        keys[name] = hashlib.blake2b(blob, digest_size=16).hexdigest()
+    return keys
+
+
+def _entry(cache_dir, name, key, suffix=None):
+    if suffix is None:
+        suffix = "" if STAGES[name].columnar else ".pkl"
+    return os.path.join(cache_dir, "stages", name, key + suffix)
+
+
+def _cached(cache_dir, name, key):
+    # Results are renamed into place once complete, so existing is enough.
+    if not os.path.exists(_entry(cache_dir, name, key)):
+        return False
+    if STAGES[name].output == "png":
+        return os.path.exists(_entry(cache_dir, name, key, ".png"))
+    return True
+
+
+def load_result(name, key, cache_dir=CACHE_DIR):
+    """The cached result of stage ``name`` for ``key``.
+
+    The frame of a columnar stage is memory-mapped and read-only.
+    """
+    if STAGES[name].columnar:
+        return read_frame(_entry(cache_dir, name, key))
+    with open(_entry(cache_dir, name, key), "rb") as source:
+        return pickle.load(source)
+
+
+def _store(cache_dir, name, key, result):
+    path = _entry(cache_dir, name, key)
+    directory = os.path.dirname(path)
+    if STAGES[name].columnar:
+        # A forced rerun replaces the entry rather than keeping the old one.
+        shutil.rmtree(path, ignore_errors=True)
+        write_frame(result, path)
+    else:
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as out:
+            pickle.dump(result, out, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+    # Only the latest result of a stage is kept.
+    for entry in os.listdir(directory):
+        if not entry.startswith((key, ".")):
+            entry = os.path.join(directory, entry)
+            if os.path.isdir(entry):
+                shutil.rmtree(entry, ignore_errors=True)
+                continue
+            try:
+                os.remove(entry)
+            except OSError:
+                pass
+
+
+def _execute(name, key, dep_keys, params, cache_dir):
+    """Run one stage from its cached inputs; returns the seconds it took."""
+    current = STAGES[name]
+    started = time.perf_counter()
+    inputs = [
+        load_result(dep, dep_key, cache_dir)
+        for dep, dep_key in zip(current.deps, dep_keys)
+    ]
+    kwargs = {p: params[p] for p in current.params}
+    os.makedirs(os.path.dirname(_entry(cache_dir, name, key)), exist_ok=True)
+    if current.output == "png":
+        kwargs["path"] = _entry(cache_dir, name, key, ".png")
+    result = current.func(*inputs, **kwargs)
+    _store(cache_dir, name, key, result)
+    return time.perf_counter() - started
+
+
+class _InlineExecutor:
+    """Runs submitted calls immediately; stands in for the pool."""
+
+    def submit(self, func, *args):
+        future = concurrent.futures.Future()
+        try:
+            future.set_result(func(*args))
+        except BaseException as error:
+            future.set_exception(error)
+        return future
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+def run(
+    targets=None,
+    csv=CSV_PATH,
+    cache_dir=CACHE_DIR,
+    workers=None,
+    top=10,
+    memory_budget=DEFAULT_MEMORY_BUDGET,
+    force=False,
+    log=None,
+):
+    """Bring ``targets`` (default: every stage) up to date.
+
+    Returns ``(keys, timings)``: the cache key of every stage involved and,
+    for the stages that actually ran, the seconds they took. ``force``
+    ignores cached results. ``log`` is called with one line per stage.
+    """
+    targets = list(STAGES) if not targets else list(targets)
+    unknown = [name for name in targets if name not in STAGES]
+    if unknown:
+        raise ValueError("unknown stages: %s" % ", ".join(unknown))
+    log = log or (lambda line: None)
+    params = {"csv": csv, "memory_budget": memory_budget, "top": top}
+    keys = stage_keys(targets, params, cache_dir)
+
+    # Stages reachable from the targets through results that are missing.
+    stale = set()
+
+    def visit(name):
+        if name in stale:
+            return
+        if not force and _cached(cache_dir, name, keys[name]):
+            log("%-18s cached" % name)
+            return
+        stale.add(name)
+        for dep in STAGES[name].deps:
+            visit(dep)
+
+    for name in targets:
+        visit(name)
+
+    remaining = [name for name in _ordered(targets) if name in stale]
+    done = set(keys) - stale
+    timings = {}
+    if workers is None or workers > 1:
+        executor = concurrent.futures.ProcessPoolExecutor(workers)
+    else:
+        executor = _InlineExecutor()
+    with executor:
+        pending = {}
+        while remaining or pending:
+            for name in [
+                name
+                for name in remaining
+                if all(dep in done for dep in STAGES[name].deps)
+            ]:
+                remaining.remove(name)
+                dep_keys = [keys[dep] for dep in STAGES[name].deps]
+                future = executor.submit(
+                    _execute, name, keys[name], dep_keys, params, cache_dir
+                )
+                pending[future] = name
+            finished, _ = concurrent.futures.wait(
+                pending, return_when=concurrent.futures.FIRST_COMPLETED
+            )
+            for future in finished:
+                name = pending.pop(future)
+                timings[name] = future.result()
+                done.add(name)
+                log("%-18s ran in %.2fs" % (name, timings[name]))
+    return keys, timings
+
+
+def export(targets, keys, out_dir=OUTPUT_DIR, cache_dir=CACHE_DIR):
+    """Write the tables (CSV) and figures (PNG) of ``targets`` to ``out_dir``.
+
+    Returns the paths written.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    written = []
+    for name in targets:
+        output = STAGES[name].output
+        if output == "png":
+            path = os.path.join(out_dir, name + ".png")
+            shutil.copyfile(_entry(cache_dir, name, keys[name], ".png"), path)
+        elif output == "csv":
+            path = os.path.join(out_dir, name + ".csv")
+            load_result(name, keys[name], cache_dir).to_csv(path)
+        else:
+            continue
+        written.append(path)
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m tmdb",
+        description="Run the TMDb movies analysis outside Jupyter.",
+    )
+    parser.add_argument(
+        "stages",
+        nargs="*",
+        metavar="STAGE",
+        help="stages to bring up to date (default: all)",
+    )
+    parser.add_argument("--csv", default=CSV_PATH, help="TMDb movies CSV")
+    parser.add_argument(
+        "--output",
+        default=OUTPUT_DIR,
+        help="directory for the exported tables and figures",
+    )
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="worker processes (default: one per CPU; 1 runs inline)",
+    )
+    parser.add_argument(
+        "--top", type=int, default=10, help="rows at each end of rankings"
+    )
+    parser.add_argument(
+        "--memory-budget",
+        type=int,
+        default=DEFAULT_MEMORY_BUDGET // 2**20,
+        metavar="MB",
+        help="bound on each CSV chunk parsed by the loader",
+    )
+    parser.add_argument(
+        "--force", action="store_true", help="ignore cached stage results"
+    )
+    parser.add_argument(
+        "--list", action="store_true", help="list the stages and exit"
+    )
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for name in _ordered(STAGES):
+            deps = ", ".join(STAGES[name].deps) or "-"
+            print("%-18s <- %s" % (name, deps))
+        return 0
+
+    targets = args.stages or list(STAGES)
+    try:
+        keys, _ = run(
+            targets,
+            csv=args.csv,
+            cache_dir=args.cache_dir,
+            workers=args.workers,
+            top=args.top,
+            memory_budget=args.memory_budget * 2**20,
+            force=args.force,
+            log=print,
+        )
+    except (ValueError, OSError) as error:
+        print("error: %s" % error, file=sys.stderr)
+        return 1
+    for path in export(targets, keys, args.output, args.cache_dir):
+        print("wrote %s" % path)
+    return 0
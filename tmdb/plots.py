@@ -0,0 +1,138 @@
+"""Aggregated versions of the scatter and point plots of the analysis.
+
+``plt.scatter`` in cells [121] and [157] draws one marker per movie, and
+``sns.pointplot(x='vote_count', ...)`` in [170] makes every distinct
+``vote_count`` a category and bootstraps a confidence interval for each. Both
+get slower, and their figures larger, as movies are added.
+
+The functions here reduce the data with numpy first and draw a fixed number
+of artists: a hexbin or 2D histogram of the point density, or the mean of
+``y`` in quantile bins of ``x`` with a normal-approximation confidence
+interval. Rendering cost and figure size then depend on the number of bins,
+not of movies.
+"""
+
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+from scipy import stats
+
+
+def density_plot(
+    data, x, y, kind="hexbin", gridsize=60, log=True, ax=None, cmap="viridis"
+):
+    """Density of the points ``(data[x], data[y])``, as a scatter would show.
+
+    ``kind`` is ``"hexbin"`` or ``"hist2d"``; ``gridsize`` is the number of
+    bins along x. With ``log`` the colour scale is logarithmic, which keeps
+    the few blockbusters visible next to the mass of small productions.
+    """
+    if ax is None:
+        ax = plt.gca()
+    xs = data[x].to_numpy(dtype=np.float64)
+    ys = data[y].to_numpy(dtype=np.float64)
+    # A logarithmic colour scale has no range to show without points.
+    log = log and len(xs) > 0
+    if kind == "hexbin":
+        artist = ax.hexbin(
+            xs,
+            ys,
+            gridsize=gridsize,
+            bins="log" if log else None,
+            mincnt=1,
+            cmap=cmap,
+        )
+    elif kind == "hist2d":
+        counts, xedges, yedges = np.histogram2d(xs, ys, bins=gridsize)
+        counts = np.ma.masked_equal(counts, 0)
+        norm = "log" if log else None
+        artist = ax.pcolormesh(xedges, yedges, counts.T, cmap=cmap, norm=norm)
+    else:
+        raise ValueError("kind must be 'hexbin' or 'hist2d', not %r" % kind)
+    ax.figure.colorbar(artist, ax=ax, label="Movies")
+    ax.set_xlabel(x)
+    ax.set_ylabel(y)
+    return ax
+
+
+def binned_means(data, x, y, bins=20, confidence=0.95):
+    """Mean of ``data[y]`` within quantile bins of ``data[x]``.
+
+    The bins are those of ``pd.qcut(data[x], bins, duplicates="drop")``:
+    ``(left, right]``, the first one including its left edge. Returns a
+    frame with one row per non-empty bin: the bin edges, the mean ``x`` of
+    the bin, the ``count``, ``mean`` and standard deviation of ``y``, and
+    the ``low``/``high`` bounds of the ``confidence`` interval of the mean
+    (normal approximation, ``z * std / sqrt(count)``). An empty ``data``
+    gives an empty frame with the same columns.
+    """
+    xs = data[x].to_numpy(dtype=np.float64)
+    ys = data[y].to_numpy(dtype=np.float64)
+    if len(xs):
+        edges = np.unique(np.quantile(xs, np.linspace(0, 1, bins + 1)))
+    else:
+        # A single, empty bin, dropped at the end like any other.
+        edges = np.zeros(1)
+    # Heavily repeated values (e.g. the minimum of 10 votes) collapse several
+    # quantiles into one edge, so there may be fewer bins than asked for.
+    if len(edges) == 1:
+        edges = np.repeat(edges, 2)
+    n_bins = len(edges) - 1
+    codes = np.searchsorted(edges, xs, side="left") - 1
+    codes = np.clip(codes, 0, n_bins - 1)
+
+    count = np.bincount(codes, minlength=n_bins).astype(np.float64)
+    present = count > 0
+    empty = np.full(n_bins, np.nan)
+    x_sum = np.bincount(codes, weights=xs, minlength=n_bins)
+    x_mean = np.divide(x_sum, count, out=empty.copy(), where=present)
+    y_sum = np.bincount(codes, weights=ys, minlength=n_bins)
+    mean = np.divide(y_sum, count, out=empty.copy(), where=present)
+    squares = np.bincount(
+        codes, weights=(ys - mean[codes]) ** 2, minlength=n_bins
+    )
+    z = stats.norm.ppf(0.5 + confidence / 2)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        std = np.sqrt(squares / (count - 1))
+        half_width = z * std / np.sqrt(count)
+
+    result = pd.DataFrame(
+        {
+            "left": edges[:-1],
+            "right": edges[1:],
+            x: x_mean,
+            "count": count.astype(np.int64),
+            "mean": mean,
+            "std": std,
+            "low": mean - half_width,
+            "high": mean + half_width,
+        }
+    )
+    return result[present].reset_index(drop=True)
+
+
+def binned_pointplot(
+    data, x, y, bins=20, confidence=0.95, logx=False, ax=None, color=None
+):
+    """Point plot of the mean ``y`` per quantile bin of ``x``.
+
+    Replaces ``sns.pointplot(x=x, y=y, data=data)`` for a numeric ``x`` with
+    many distinct values: points are placed at the mean ``x`` of each bin and
+    the error bars show the ``confidence`` interval of the mean.
+    """
+    if ax is None:
+        ax = plt.gca()
+    table = binned_means(data, x, y, bins, confidence)
+    ax.errorbar(
+        table[x],
+        table["mean"],
+        yerr=[table["mean"] - table["low"], table["high"] - table["mean"]],
+        marker="o",
+        capsize=3,
+        color=color,
+    )
+    if logx:
+        ax.set_xscale("log")
+    ax.set_xlabel(x)
+    ax.set_ylabel(y)
+    return ax
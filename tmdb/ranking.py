@@ -0,0 +1,291 @@
+"""Top-k rankings without sorting the whole frame.
+
+Cell [116] sorts every movie by ``['revenue', 'vote_average',
+'release_year']`` to read the first and last lines of the result. The
+functions here return the same lines by partitioning on the leading key
+(``np.partition``) and only fully sorting the handful of candidates that can
+still make the cut, falling through to the next key when candidates tie.
+
+The order is the one of ``DataFrame.sort_values(..., kind="stable")``:
+missing values go where ``na_position`` says and complete ties keep the order
+of the frame. Multi-key ``sort_values`` is always stable, so for more than
+one key ``kind`` makes no difference.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Groups larger than this are ranked one at a time by partitioning; smaller
+# ones share a single sort.
+_SELECT_GROUP_ROWS = 4096
+
+
+class _Key:
+    """One sort column as comparable values plus a missing-value mask."""
+
+    def __init__(self, values, ascending, na_first):
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            codes = values.cat.codes.to_numpy()
+            missing = codes < 0
+            values = codes
+        elif pd.api.types.is_bool_dtype(values.dtype) or (
+            pd.api.types.is_numeric_dtype(values.dtype)
+            and not pd.api.types.is_extension_array_dtype(values.dtype)
+        ):
+            values = values.to_numpy()
+            missing = pd.isna(values)
+            if values.dtype.kind == "b":
+                values = values.astype(np.int8)
+        else:
+            # Strings, datetimes and nullable types compare through the
+            # codes of their sorted distinct values.
+            codes, _ = pd.factorize(values, sort=True)
+            missing = codes < 0
+            values = codes
+        self.values = values
+        self.missing = np.asarray(missing, dtype=bool)
+        self.ascending = ascending
+        self.na_first = na_first
+
+    def reversed(self):
+        """The key of the frame read bottom-up, with the order flipped."""
+        key = _Key.__new__(_Key)
+        key.values = self.values[::-1]
+        key.missing = self.missing[::-1]
+        key.ascending = not self.ascending
+        key.na_first = not self.na_first
+        return key
+
+    def take(self, positions):
+        """The key of the rows at ``positions``."""
+        key = _Key.__new__(_Key)
+        key.values = self.values[positions]
+        key.missing = self.missing[positions]
+        key.ascending = self.ascending
+        key.na_first = self.na_first
+        return key
+
+
+def _keys(frame, by, ascending, na_position):
+    if isinstance(by, str):
+        by = [by]
+    if isinstance(ascending, bool):
+        ascending = [ascending] * len(by)
+    if len(ascending) != len(by):
+        raise ValueError(
+            "Length of ascending (%d) != length of by (%d)"
+            % (len(ascending), len(by))
+        )
+    if na_position not in ("first", "last"):
+        raise ValueError("invalid na_position: %r" % (na_position,))
+    return [
+        _Key(frame[column], bool(up), na_position == "first")
+        for column, up in zip(by, ascending)
+    ]
+
+
+def _sort(keys, rows, level, major=None):
+    """Fully order ``rows`` (ascending positions) on ``keys[level:]``.
+
+    ``major``, if given, holds a code per position that orders before every
+    key.
+    """
+    if (level == len(keys) and major is None) or len(rows) < 2:
+        return rows
+    columns = []
+    for key in keys[level:]:
+        missing = key.missing[rows]
+        values = key.values[rows].copy()
+        values[missing] = values[~missing][0] if (~missing).any() else 0
+        _, ranks = np.unique(values, return_inverse=True)
+        ranks = ranks.ravel().astype(np.int64)
+        if not key.ascending:
+            ranks = -ranks
+        group = missing if not key.na_first else ~missing
+        columns.append((group, ranks))
+    # np.lexsort wants the most significant key last; it is stable, so ties
+    # keep the (ascending) order of ``rows``.
+    parts = [
+        part for group, ranks in reversed(columns) for part in (ranks, group)
+    ]
+    if major is not None:
+        parts.append(major[rows])
+    return rows[np.lexsort(parts)]
+
+
+def _select(keys, rows, k, level):
+    """Positions of the first ``k`` of ``rows`` in sorted order."""
+    if k <= 0:
+        return rows[:0]
+    if level == len(keys):
+        return rows[:k]
+    if len(rows) <= k:
+        return _sort(keys, rows, level)
+
+    key = keys[level]
+    missing = key.missing[rows]
+    leading, trailing = (
+        (rows[missing], rows[~missing])
+        if key.na_first
+        else (rows[~missing], rows[missing])
+    )
+    if len(leading) >= k:
+        if key.na_first:
+            # Missing values all tie on this key; decide on the next one.
+            return _select(keys, leading, k, level + 1)
+        return _select_present(keys, leading, k, level)
+    head = (
+        _sort(keys, leading, level + 1)
+        if key.na_first
+        else _sort(keys, leading, level)
+    )
+    rest = k - len(leading)
+    if key.na_first:
+        tail = _select_present(keys, trailing, rest, level)
+    else:
+        tail = _select(keys, trailing, rest, level + 1)
+    return np.concatenate([head, tail])
+
+
+def _select_present(keys, rows, k, level):
+    """``_select`` for rows whose value at ``level`` is not missing."""
+    if len(rows) <= k:
+        return _sort(keys, rows, level)
+    key = keys[level]
+    values = key.values[rows]
+    if key.ascending:
+        kth = np.partition(values, k - 1)[k - 1]
+        better = values < kth
+    else:
+        kth = np.partition(values, len(values) - k)[len(values) - k]
+        better = values > kth
+    ahead = _sort(keys, rows[better], level)
+    tied = rows[values == kth]
+    return np.concatenate(
+        [ahead, _select(keys, tied, k - len(ahead), level + 1)]
+    )
+
+
+def top_k_positions(frame, by, k, ascending=True, na_position="last"):
+    """Positions of ``frame.sort_values(...).head(k)`` within ``frame``."""
+    keys = _keys(frame, by, ascending, na_position)
+    rows = np.arange(len(frame))
+    return _select(keys, rows, min(k, len(frame)), 0)
+
+
+def top_k(frame, by, k, ascending=True, na_position="last"):
+    """Same rows and order as::
+
+        frame.sort_values(by, ascending=ascending, na_position=na_position,
+                          kind="stable").head(k)
+
+    without sorting the whole frame.
+    """
+    return frame.iloc[top_k_positions(frame, by, k, ascending, na_position)]
+
+
+def bottom_k(frame, by, k, ascending=True, na_position="last"):
+    """Same rows and order as ``frame.sort_values(...).tail(k)``.
+
+    The arguments are those of ``top_k``.
+    """
+    keys = [key.reversed() for key in _keys(frame, by, ascending, na_position)]
+    n = len(frame)
+    rows = np.arange(n)
+    positions = _select(keys, rows, min(k, n), 0)
+    return frame.iloc[(n - 1 - positions)[::-1]]
+
+
+def _group_codes(frame, group):
+    if isinstance(group, str):
+        group = frame[group]
+    codes, _ = pd.factorize(pd.Series(group).reset_index(drop=True))
+    return codes
+
+
+def _group_rows(codes):
+    """Positions with a group code, grouped by code, and the group sizes.
+
+    Positions stay ascending inside each group.
+    """
+    rows = np.flatnonzero(codes >= 0)
+    grouped = codes[rows]
+    sizes = np.bincount(grouped)
+    if len(sizes) <= np.iinfo(np.uint16).max + 1:
+        # Stable sorts of 16-bit integers are radix sorts.
+        grouped = grouped.astype(np.uint16)
+    return rows[np.argsort(grouped, kind="stable")], sizes
+
+
+def _grouped_positions(keys, codes, k):
+    """Sorted positions of the first ``k`` rows of each group."""
+    rows, sizes = _group_rows(codes)
+    if k <= 0 or len(rows) == 0:
+        return rows[:0]
+    # Groups of at most k rows are kept whole, mid-sized groups are ranked
+    # together by one sort on (group, keys...) and large groups are each
+    # partitioned by ``_select``, so no sort runs over all the rows.
+    large = max(k, _SELECT_GROUP_ROWS)
+    kept = [rows[np.repeat(sizes <= k, sizes)]]
+
+    batch = rows[np.repeat((sizes > k) & (sizes <= large), sizes)]
+    if len(batch):
+        batch = _sort(keys, batch, 0, major=codes)
+        batch_codes = codes[batch]
+        starts = np.flatnonzero(
+            np.r_[True, batch_codes[1:] != batch_codes[:-1]]
+        )
+        rank = np.arange(len(batch)) - np.repeat(
+            starts, np.diff(np.r_[starts, len(batch)])
+        )
+        kept.append(batch[rank < k])
+
+    bounds = np.r_[0, np.cumsum(sizes)]
+    for group in np.flatnonzero(sizes > large):
+        group_rows = rows[bounds[group] : bounds[group + 1]]
+        kept.append(_select(keys, group_rows, k, 0))
+    return _sort(keys, np.sort(np.concatenate(kept)), 0)
+
+
+def top_k_by(frame, group, by, k, ascending=True, na_position="last"):
+    """Top ``k`` rows of every group, like::
+
+        frame.sort_values(by, ascending=ascending, na_position=na_position,
+                          kind="stable").groupby(group).head(k)
+
+    ``group`` is a column name or an array of labels aligned with ``frame``.
+    Rows with a missing group label are left out, as ``groupby`` does.
+    """
+    keys = _keys(frame, by, ascending, na_position)
+    positions = _grouped_positions(keys, _group_codes(frame, group), k)
+    return frame.iloc[positions]
+
+
+def top_k_by_token(
+    frame, tokens, by, k, ascending=True, na_position="last", name="token"
+):
+    """Top ``k`` movies of every token of a ``TokenIndex``.
+
+    A movie competes once in the ranking of each distinct token of its
+    field, e.g. the top 10 by revenue per genre. The result has the columns
+    of ``frame`` plus ``name`` holding the token, and the order of::
+
+        exploded.sort_values(by, ..., kind="stable").groupby(name).head(k)
+
+    where ``exploded`` repeats each movie once per token, in vocabulary
+    order.
+    """
+    matrix = tokens.matrix.tocsr()
+    movies = np.repeat(np.arange(matrix.shape[0]), np.diff(matrix.indptr))
+    # Rank the (movie, token) entries on the keys of their movie, without
+    # building the exploded frame.
+    keys = [
+        key.take(movies)
+        for key in _keys(frame, by, ascending, na_position)
+    ]
+    codes = matrix.indices.astype(np.int64)
+    positions = _grouped_positions(keys, codes, k)
+    result = frame.iloc[movies[positions]].copy()
+    labels = np.asarray(tokens.vocabulary, dtype=object)
+    result[name] = labels[codes[positions]]
+    return result
@@ -0,0 +1,261 @@
+"""Mergeable summary statistics of the movies.
+
+``describe()`` of the cleaned movies, the token counts of [142]/[144] and the
+correlation heatmap of [138] are recomputed over the whole history whenever
+movies are added. ``MovieStats`` keeps sufficient statistics instead:
+
+* count, mean and co-moment matrix (Chan et al. parallel update of Welford's
+  algorithm), giving means, standard deviations and correlations;
+* min/max and, unless ``quantiles=False``, a value -> count table per
+  column, giving exact quartiles;
+* token -> count tables for the pipe-delimited columns.
+
+Two ``MovieStats`` merge in time independent of the rows they summarise
+(apart from the tables, which grow with distinct values), so appending a
+batch costs time proportional to the batch, and chunks can be summarised in
+separate processes and merged afterwards. The value tables of near-continuous
+columns such as ``budget`` and ``revenue`` hold about one entry per movie;
+without ``quantiles`` only fixed-size accumulators are kept, which is all
+``corr`` needs.
+"""
+
+import collections
+import concurrent.futures
+import functools
+import itertools
+
+import numpy as np
+import pandas as pd
+
+from tmdb.loader import CSV_PATH, DEFAULT_MEMORY_BUDGET, iter_movie_chunks
+from tmdb.tokens import TokenIndex
+
+# Numeric columns of the cleaned frame (cells [113]-[114]), in frame order.
+# Cell [109] describes the frame before ``dropna``, with the adjusted columns
+# too; the ``describe`` stage of ``tmdb.pipeline`` reproduces that table.
+DESCRIBE_COLUMNS = [
+    "budget",
+    "revenue",
+    "vote_count",
+    "vote_average",
+    "release_year",
+]
+# Columns of the heatmap in cell [138].
+CORR_COLUMNS = ["release_year", "budget", "revenue", "vote_average"]
+TOKEN_COLUMNS = ["genres", "production_companies"]
+
+PERCENTILES = [0.25, 0.5, 0.75]
+
+
+def _quantile(table, q):
+    """Linearly interpolated quantile from a value -> count table."""
+    values = np.array(sorted(table), dtype=np.float64)
+    cumulative = np.cumsum([table[value] for value in values])
+    position = (cumulative[-1] - 1) * q
+    below = int(np.floor(position))
+    above = min(below + 1, cumulative[-1] - 1)
+    lower, upper = values[
+        np.searchsorted(cumulative, [below, above], side="right")
+    ]
+    return lower + (upper - lower) * (position - below)
+
+
+class MovieStats:
+    """Sufficient statistics of a set of cleaned movies.
+
+    Build one with ``from_frame``, then ``update`` it with new rows or
+    ``merge`` another instance into it. ``describe``, ``corr`` and
+    ``value_counts`` give the pandas results for all the rows seen so far.
+    With ``quantiles=False`` no value tables are kept and ``describe`` only
+    accepts an empty ``percentiles``.
+    """
+
+    def __init__(
+        self,
+        columns=DESCRIBE_COLUMNS,
+        token_columns=TOKEN_COLUMNS,
+        quantiles=True,
+    ):
+        self.columns = list(columns)
+        self.token_columns = list(token_columns)
+        self.quantiles = quantiles
+        p = len(self.columns)
+        self.n = 0
+        self.mean = np.zeros(p)
+        self.comoment = np.zeros((p, p))
+        self.min = np.full(p, np.inf)
+        self.max = np.full(p, -np.inf)
+        self.values = {
+            column: collections.Counter()
+            for column in (self.columns if quantiles else ())
+        }
+        self.tokens = {
+            column: collections.Counter() for column in token_columns
+        }
+
+    @classmethod
+    def from_frame(
+        cls,
+        frame,
+        columns=DESCRIBE_COLUMNS,
+        token_columns=TOKEN_COLUMNS,
+        quantiles=True,
+    ):
+        """Statistics of the rows of ``frame`` (a cleaned movies frame)."""
+        stats = cls(columns, token_columns, quantiles)
+        if len(frame) == 0:
+            return stats
+        data = frame[stats.columns].to_numpy(dtype=np.float64)
+        stats.n = len(data)
+        stats.mean = data.mean(axis=0)
+        centered = data - stats.mean
+        stats.comoment = centered.T @ centered
+        stats.min = data.min(axis=0)
+        stats.max = data.max(axis=0)
+        for k, column in enumerate(stats.columns if quantiles else ()):
+            values, counts = np.unique(data[:, k], return_counts=True)
+            stats.values[column].update(
+                dict(zip(values.tolist(), counts.tolist()))
+            )
+        for column in stats.token_columns:
+            index = TokenIndex.from_series(frame[column])
+            # The vocabulary is in order of first appearance, which keeps
+            # value_counts ties in the order pandas gives them.
+            stats.tokens[column].update(
+                dict(zip(index.vocabulary, index.counts.tolist()))
+            )
+        return stats
+
+    def merge(self, other):
+        """Add the rows summarised by ``other`` to this instance.
+
+        ``other`` is treated as the later rows, which only matters for the
+        order of tied token counts. Returns ``self``.
+        """
+        if other.columns != self.columns:
+            raise ValueError("cannot merge statistics of different columns")
+        if other.quantiles != self.quantiles:
+            raise ValueError(
+                "cannot merge statistics with and without quantiles"
+            )
+        if other.n == 0:
+            return self
+        n = self.n + other.n
+        delta = other.mean - self.mean
+        self.comoment = (
+            self.comoment
+            + other.comoment
+            + np.outer(delta, delta) * (self.n * other.n / n)
+        )
+        self.mean = self.mean + delta * (other.n / n)
+        self.n = n
+        self.min = np.minimum(self.min, other.min)
+        self.max = np.maximum(self.max, other.max)
+        for column in self.values:
+            self.values[column].update(other.values[column])
+        for column in self.token_columns:
+            self.tokens[column].update(other.tokens[column])
+        return self
+
+    def update(self, frame):
+        """Add the rows of ``frame``; costs time proportional to ``frame``."""
+        return self.merge(
+            MovieStats.from_frame(
+                frame, self.columns, self.token_columns, self.quantiles
+            )
+        )
+
+    def _std(self):
+        if self.n < 2:
+            return np.full(len(self.columns), np.nan)
+        return np.sqrt(np.diag(self.comoment) / (self.n - 1))
+
+    def describe(self, percentiles=PERCENTILES):
+        """The table of ``frame[columns].describe()``."""
+        if len(percentiles) and not self.quantiles:
+            raise ValueError("percentiles need quantiles=True")
+        if self.n == 0:
+            missing = np.full(len(self.columns), np.nan)
+            mean = low = high = missing
+            quartiles = [missing] * len(percentiles)
+        else:
+            mean, low, high = self.mean, self.min, self.max
+            quartiles = [
+                [_quantile(self.values[column], q) for column in self.columns]
+                for q in percentiles
+            ]
+        rows = {
+            "count": np.full(len(self.columns), float(self.n)),
+            "mean": mean,
+            "std": self._std(),
+            "min": low,
+        }
+        for q, values in zip(percentiles, quartiles):
+            rows["%g%%" % (q * 100)] = values
+        rows["max"] = high
+        return pd.DataFrame(rows, index=self.columns).T
+
+    def corr(self, columns=CORR_COLUMNS):
+        """Pearson correlation matrix, as ``frame[columns].corr()``."""
+        positions = [self.columns.index(column) for column in columns]
+        comoment = self.comoment[np.ix_(positions, positions)]
+        scale = np.sqrt(np.diag(comoment))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            corr = comoment / np.outer(scale, scale)
+        # pandas leaves constant columns (and single rows) at NaN.
+        corr[np.diag_indices_from(corr)] = np.where(scale > 0, 1.0, np.nan)
+        return pd.DataFrame(corr, index=columns, columns=columns)
+
+    def value_counts(self, column, ascending=False):
+        """Token counts, as ``TokenIndex.value_counts`` of all rows seen."""
+        table = self.tokens[column]
+        result = pd.Series(
+            list(table.values()),
+            index=pd.Index(list(table), dtype=object),
+            dtype=np.int64,
+            name="count",
+        )
+        return result.sort_values(ascending=ascending, kind="stable")
+
+
+def stats_from_chunks(chunks, workers=None, quantiles=True):
+    """Summarise an iterable of cleaned frames, optionally in parallel.
+
+    With ``workers`` > 1 the chunks are summarised in that many processes;
+    at most twice that many chunks are in flight at once. Results are merged
+    in chunk order, so the outcome does not depend on ``workers``.
+    """
+    total = MovieStats(quantiles=quantiles)
+    summarise = functools.partial(MovieStats.from_frame, quantiles=quantiles)
+    chunks = iter(chunks)
+    if workers is None or workers <= 1:
+        for chunk in chunks:
+            total.update(chunk)
+        return total
+
+    with concurrent.futures.ProcessPoolExecutor(workers) as pool:
+        pending = collections.deque(
+            pool.submit(summarise, chunk)
+            for chunk in itertools.islice(chunks, 2 * workers)
+        )
+        while pending:
+            total.merge(pending.popleft().result())
+            for chunk in itertools.islice(chunks, 1):
+                pending.append(pool.submit(summarise, chunk))
+    return total
+
+
+def stats_from_csv(
+    path=CSV_PATH,
+    workers=None,
+    memory_budget=DEFAULT_MEMORY_BUDGET,
+    chunksize=None,
+    quantiles=True,
+):
+    """``MovieStats`` of the cleaned movies of tmdb-movies.csv.
+
+    The file is read in chunks by the loader, so these are the rows of
+    ``load_movies``, after ``dropna``.
+    """
+    chunks = iter_movie_chunks(path, memory_budget, chunksize)
+    return stats_from_chunks(chunks, workers, quantiles)
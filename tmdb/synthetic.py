@@ -0,0 +1,302 @@
+"""Synthetic tmdb-movies.csv files of any size.
+
+The real export has 10,866 movies. To see how the analysis scales, this
+module writes files with the same 21 columns and distributions shaped like
+the ones the notebook describes:
+
+* budgets and revenues are zero for about half of the movies and
+  log-normal (heavy tailed) otherwise, with revenue following budget;
+* ``genres``, ``production_companies``, ``cast`` and ``keywords`` are
+  pipe-delimited lists drawn from Zipf-distributed vocabularies, the company
+  vocabulary growing with the number of rows;
+* missing ``genres`` and ``production_companies`` concentrate on movies
+  without budget or revenue, as the histograms of cells [111]/[112] show, and
+  ``homepage``, ``tagline`` and ``keywords`` are often missing;
+* the number of movies per ``release_year`` grows over 1960-2015, and
+  ``vote_count`` is heavy tailed with a minimum of 10.
+
+Rows are generated and written in chunks, so files far larger than memory
+can be produced.
+"""
+
+import numpy as np
+import pandas as pd
+
+from tmdb.loader import CSV_PATH
+
+COLUMNS = [
+    "id",
+    "imdb_id",
+    "popularity",
+    "budget",
+    "revenue",
+    "original_title",
+    "cast",
+    "homepage",
+    "director",
+    "tagline",
+    "keywords",
+    "overview",
+    "runtime",
+    "genres",
+    "production_companies",
+    "release_date",
+    "vote_count",
+    "vote_average",
+    "release_year",
+    "budget_adj",
+    "revenue_adj",
+]
+
+GENRES = [
+    "Drama",
+    "Comedy",
+    "Thriller",
+    "Action",
+    "Romance",
+    "Horror",
+    "Adventure",
+    "Crime",
+    "Family",
+    "Science Fiction",
+    "Fantasy",
+    "Mystery",
+    "Animation",
+    "Documentary",
+    "Music",
+    "History",
+    "War",
+    "Foreign",
+    "TV Movie",
+    "Western",
+]
+
+# The most active producers of cell [144], most active first.
+COMPANIES = [
+    "Universal Pictures",
+    "Warner Bros.",
+    "Paramount Pictures",
+    "Twentieth Century Fox Film Corporation",
+    "Columbia Pictures",
+    "New Line Cinema",
+    "Metro-Goldwyn-Mayer (MGM)",
+    "Walt Disney Pictures",
+    "Touchstone Pictures",
+    "Columbia Pictures Corporation",
+    "Marvel Studios",
+]
+
+FIRST_YEAR, LAST_YEAR = 1960, 2015
+
+_WORDS = np.array(
+    "the a of and love night last city man story dark world life day house "
+    "dead time girl war star home king blood secret return black new game "
+    "little lost big family road heart island summer ghost rise fall".split(),
+    dtype=object,
+)
+
+_CHUNK_ROWS = 250_000
+
+# Real budgets stay far below this; see ``oversized_budgets``.
+_INT32_MAX = 2**31 - 1
+
+# Free-text columns are dropped by the analysis; drawing them from a pool
+# keeps their size realistic without paying for a join per row.
+_POOL_SIZE = 4096
+
+
+def _zipf_probabilities(size, exponent):
+    weights = 1.0 / np.arange(1, size + 1) ** exponent
+    return weights / weights.sum()
+
+
+def _vocabulary(known, size, prefix):
+    extra = ["%s %d" % (prefix, i) for i in range(max(0, size - len(known)))]
+    return np.array(list(known[:size]) + extra, dtype=object)
+
+
+def _pipe_lists(rng, vocabulary, probabilities, n, lengths):
+    """``n`` pipe-delimited lists of Zipf-drawn tokens without repeats."""
+    longest = int(lengths.max()) if n else 0
+    drawn = vocabulary[
+        rng.choice(len(vocabulary), size=(n, longest), p=probabilities)
+    ]
+    return np.array(
+        [
+            "|".join(dict.fromkeys(row[:length]))
+            for row, length in zip(drawn.tolist(), lengths.tolist())
+        ],
+        dtype=object,
+    )
+
+
+def _sentences(rng, n, words):
+    picks = _WORDS[rng.integers(0, len(_WORDS), size=(n, words))]
+    return np.array([" ".join(row) for row in picks.tolist()], dtype=object)
+
+
+def _pooled(rng, pool, n):
+    return pool[rng.integers(0, len(pool), n)]
+
+
+def _dates(month, day, year):
+    """``m/d/yy`` strings, the format of ``release_date``."""
+    yy = np.char.zfill((year % 100).astype(str), 2)
+    return np.char.add(
+        np.char.add(np.char.add(month, "/"), np.char.add(day, "/")), yy
+    ).astype(object)
+
+
+def _with_missing(values, missing):
+    values = values.astype(object)
+    values[missing] = None
+    return values
+
+
+class _Generator:
+    """Draws chunks of rows for a file of ``rows`` movies."""
+
+    def __init__(self, rows, seed, oversized_budgets=0.0):
+        self.rng = np.random.default_rng(seed)
+        self.oversized_budgets = oversized_budgets
+        companies = max(len(COMPANIES), min(200_000, 500 + rows // 2))
+        self.companies = _vocabulary(COMPANIES, companies, "Company")
+        self.company_p = _zipf_probabilities(companies, 0.7)
+        self.genres = np.array(GENRES, dtype=object)
+        self.genre_p = _zipf_probabilities(len(GENRES), 0.6)
+        people = max(1000, min(500_000, rows))
+        self.people = _vocabulary([], people, "Person")
+        self.people_p = _zipf_probabilities(people, 1.0)
+        keywords = _vocabulary([], 5000, "keyword")
+        keyword_p = _zipf_probabilities(len(keywords), 1.0)
+
+        rng, pool = self.rng, _POOL_SIZE
+        self.titles = _sentences(rng, pool, 3)
+        self.taglines = _sentences(rng, pool, 6)
+        self.overviews = _sentences(rng, pool, 40)
+        self.casts = _pipe_lists(
+            rng, self.people, self.people_p, pool, np.full(pool, 5)
+        )
+        self.keyword_lists = _pipe_lists(
+            rng, keywords, keyword_p, pool, rng.integers(1, 6, pool)
+        )
+        years = np.arange(FIRST_YEAR, LAST_YEAR + 1)
+        weights = np.exp(0.06 * (years - FIRST_YEAR))
+        self.years, self.year_p = years, weights / weights.sum()
+
+    def chunk(self, start, n):
+        rng = self.rng
+        year = rng.choice(self.years, size=n, p=self.year_p)
+        # Newer movies are more often reported with a budget.
+        age = (year - FIRST_YEAR) / (LAST_YEAR - FIRST_YEAR)
+        reported = rng.random(n) < 0.15 + 0.35 * age
+        budget = np.where(
+            reported,
+            np.minimum(rng.lognormal(16.5, 1.3, n), 425e6).round(-3),
+            0,
+        ).astype(np.int64)
+        revenue = np.where(
+            reported & (rng.random(n) < 0.85),
+            np.minimum(
+                np.maximum(budget, 1e5) * rng.lognormal(0.6, 1.2, n), 2.8e9
+            ).round(),
+            0,
+        ).astype(np.int64)
+        if self.oversized_budgets:
+            # Drawn only when asked for, so the default files do not change.
+            oversized = reported & (rng.random(n) < self.oversized_budgets)
+            budget[oversized] = rng.integers(
+                _INT32_MAX + 1, 4 * _INT32_MAX, oversized.sum()
+            ).round(-3)
+        unknown = (budget == 0) & (revenue == 0)
+
+        vote_count = np.minimum(
+            10 + np.floor(rng.lognormal(3.3, 1.5, n)) * (1 + 3 * reported),
+            9767,
+        ).astype(np.int64)
+        vote_average = np.clip(
+            rng.normal(5.75 + 0.15 * np.log10(vote_count), 0.9), 1.5, 9.2
+        ).round(1)
+        inflation = 1.0 + 0.04 * (LAST_YEAR - year)
+
+        genre_lengths = rng.choice(
+            [1, 2, 3, 4, 5], size=n, p=[0.25, 0.33, 0.27, 0.11, 0.04]
+        )
+        company_lengths = rng.choice(
+            [1, 2, 3, 4, 5], size=n, p=[0.4, 0.27, 0.18, 0.1, 0.05]
+        )
+        genres = _pipe_lists(rng, self.genres, self.genre_p, n, genre_lengths)
+        companies = _pipe_lists(
+            rng, self.companies, self.company_p, n, company_lengths
+        )
+        month = rng.integers(1, 13, n).astype(str)
+        day = rng.integers(1, 29, n).astype(str)
+
+        ids = np.arange(start, start + n) + 1
+        columns = {
+            "id": ids,
+            "imdb_id": np.char.add("tt", np.char.zfill(ids.astype(str), 7)),
+            "popularity": rng.lognormal(-0.9, 1.0, n).round(6),
+            "budget": budget,
+            "revenue": revenue,
+            "original_title": _pooled(rng, self.titles, n),
+            "cast": _pooled(rng, self.casts, n),
+            "homepage": _with_missing(
+                np.char.add("http://www.movie", ids.astype(str)),
+                rng.random(n) < 0.73,
+            ),
+            "director": _with_missing(
+                self.people[rng.choice(len(self.people), n, p=self.people_p)],
+                rng.random(n) < 0.004,
+            ),
+            "tagline": _with_missing(
+                _pooled(rng, self.taglines, n), rng.random(n) < 0.26
+            ),
+            "keywords": _with_missing(
+                _pooled(rng, self.keyword_lists, n), rng.random(n) < 0.14
+            ),
+            "overview": _with_missing(
+                _pooled(rng, self.overviews, n), rng.random(n) < 0.0005
+            ),
+            "runtime": np.clip(rng.normal(102, 30, n), 0, 900).astype(int),
+            "genres": _with_missing(
+                genres, rng.random(n) < np.where(unknown, 0.004, 0.0003)
+            ),
+            "production_companies": _with_missing(
+                companies, rng.random(n) < np.where(unknown, 0.17, 0.02)
+            ),
+            "release_date": _dates(month, day, year),
+            "vote_count": vote_count,
+            "vote_average": vote_average,
+            "release_year": year,
+            "budget_adj": (budget * inflation).round(4),
+            "revenue_adj": (revenue * inflation).round(4),
+        }
+        return pd.DataFrame(columns, columns=COLUMNS)
+
+
+def generate_csv(
+    path=CSV_PATH,
+    rows=10_866,
+    seed=0,
+    chunk_rows=_CHUNK_ROWS,
+    oversized_budgets=0.0,
+):
+    """Write a synthetic tmdb-movies.csv of ``rows`` movies to ``path``.
+
+    The same arguments always give the same file. Budgets are capped at
+    425,000,000 like the real ones; ``oversized_budgets`` is the fraction of
+    the movies with a budget that get one beyond the int32 range instead,
+    to exercise the loader's range checks. Returns ``path``.
+    """
+    generator = _Generator(rows, seed, oversized_budgets)
+    with open(path, "w", newline="") as out:
+        for start in range(0, max(rows, 1), chunk_rows):
+            n = min(chunk_rows, rows - start)
+            if n <= 0:
+                break
+            chunk = generator.chunk(start, n)
+            chunk.to_csv(out, index=False, header=start == 0)
+    if rows == 0:
+        pd.DataFrame(columns=COLUMNS).to_csv(path, index=False)
+    return path
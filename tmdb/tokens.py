@@ -0,0 +1,156 @@
+"""Interned token index for the pipe-delimited columns.
+
+``genres`` and ``production_companies`` hold several values per movie, e.g.
+``"Action|Adventure|Science Fiction"``. Cells [142] and [144] count them with
+``df[col].str.cat(sep="|").split("|")``, which builds one string the size of
+the whole column and a Python object per token, every time a question is
+asked.
+
+``TokenIndex`` parses each *distinct* field value once, interns the tokens
+into a vocabulary and keeps a sparse CSR movie x token incidence matrix.
+Counts, per-token aggregates and "movies with token X" filters are then
+sparse matrix operations.
+"""
+
+import sys
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+
+class TokenIndex:
+    """Vocabulary and movie x token incidence of a pipe-delimited column.
+
+    Attributes
+    ----------
+    vocabulary : pandas.Index
+        Distinct tokens, in order of first appearance in the column.
+    matrix : scipy.sparse.csr_matrix
+        ``(n_rows, n_tokens)`` 0/1 matrix; row ``i`` marks the tokens of the
+        ``i``-th value of the column (positionally, not by label).
+    counts : numpy.ndarray
+        Occurrences of each token, counting a token repeated inside one field
+        as often as it appears, like ``str.cat(...).split(...)`` does.
+    """
+
+    def __init__(self, vocabulary, matrix, counts):
+        self.vocabulary = pd.Index(vocabulary, dtype=object)
+        self.matrix = matrix.tocsr()
+        self.counts = np.asarray(counts, dtype=np.int64)
+        self._columns = None
+
+    @classmethod
+    def from_series(cls, series, sep="|"):
+        """Build the index of ``series``; missing values have no tokens.
+
+        Each distinct value is split only once, so the cost of the Python
+        part grows with the number of distinct values rather than of rows.
+        """
+        codes, uniques = pd.factorize(series)
+        uniques = np.asarray(uniques, dtype=object)
+
+        # Token ids follow the order of first appearance: values come out of
+        # factorize in that order, and so do the tokens inside each value.
+        ids = {}
+        unique_rows, token_ids = [], []
+        for position, value in enumerate(uniques):
+            for token in value.split(sep):
+                token = sys.intern(token)
+                token_id = ids.setdefault(token, len(ids))
+                unique_rows.append(position)
+                token_ids.append(token_id)
+
+        n_uniques, n_tokens = len(uniques), len(ids)
+        # One extra, empty row stands for the missing values (code -1).
+        per_unique = sparse.csr_matrix(
+            (
+                np.ones(len(token_ids), dtype=np.int32),
+                (np.asarray(unique_rows, dtype=np.int64), token_ids),
+            ),
+            shape=(n_uniques + 1, n_tokens),
+        )
+        frequency = np.bincount(codes[codes >= 0], minlength=n_uniques)
+        counts = per_unique[:n_uniques].T @ frequency
+
+        codes = np.where(codes >= 0, codes, n_uniques)
+        binary = per_unique.copy()
+        binary.data = np.ones_like(binary.data, dtype=np.int8)
+        matrix = binary[codes]
+        matrix.sort_indices()
+        return cls(list(ids), matrix, counts)
+
+    def __len__(self):
+        return len(self.vocabulary)
+
+    def __contains__(self, token):
+        return token in self.vocabulary
+
+    def token_id(self, token):
+        """Column of ``token`` in ``matrix``; ``KeyError`` if unknown."""
+        return self.vocabulary.get_loc(token)
+
+    def value_counts(self, ascending=False):
+        """Token counts, like ``pd.Series(tokens).value_counts(...)``.
+
+        Ties keep the order in which the tokens first appear, so slicing the
+        result as cells [142] and [144] do gives the same table.
+        """
+        result = pd.Series(self.counts, index=self.vocabulary, name="count")
+        return result.sort_values(ascending=ascending, kind="stable")
+
+    def top(self, n=10):
+        """The ``n`` most frequent tokens with their counts."""
+        return self.value_counts().head(n)
+
+    def _csc(self):
+        if self._columns is None:
+            self._columns = self.matrix.tocsc()
+        return self._columns
+
+    def rows_with(self, token):
+        """Boolean mask of the rows whose field contains ``token``.
+
+        ``df[index.rows_with("Action")]`` selects the Action movies.
+        """
+        columns = self._csc()
+        j = self.token_id(token)
+        mask = np.zeros(self.matrix.shape[0], dtype=bool)
+        mask[columns.indices[columns.indptr[j] : columns.indptr[j + 1]]] = True
+        return mask
+
+    def aggregate(self, values, how=("count", "sum", "mean")):
+        """Per-token statistics of ``values`` over the movies of each token.
+
+        ``values`` is a Series or DataFrame aligned positionally with the
+        indexed column (usually ``df[["revenue", "vote_average"]]``). A movie
+        counts once for each distinct token of its field. Returns a frame
+        indexed by token; for a DataFrame the columns are
+        ``(value column, statistic)`` pairs.
+        """
+        if isinstance(values, pd.Series):
+            frame, single = values.to_frame(), True
+        else:
+            frame, single = values, False
+        if len(frame) != self.matrix.shape[0]:
+            raise ValueError(
+                "values have %d rows, the index has %d"
+                % (len(frame), self.matrix.shape[0])
+            )
+        transposed = self.matrix.T.tocsr()
+        movies = np.asarray(transposed.sum(axis=1)).ravel()
+        sums = transposed @ frame.to_numpy(dtype=np.float64)
+
+        result = {}
+        for k, column in enumerate(frame.columns):
+            stats = {
+                "count": movies,
+                "sum": sums[:, k],
+                "mean": sums[:, k] / np.where(movies > 0, movies, np.nan),
+            }
+            for name in how:
+                result[(column, name)] = stats[name]
+        result = pd.DataFrame(result, index=self.vocabulary)
+        if single:
+            result.columns = result.columns.droplevel(0)
+        return result